@@ -1,28 +1,52 @@
-from flask import Flask
-from flask_cors import CORS
-from dotenv import load_dotenv
-from flask_session import Session
+import os
+import tempfile
 
-from app.api import clickwrap, requests, common, auth
+from dotenv import load_dotenv
 
+# The app modules read their settings from the environment when imported
 load_dotenv()
 
+# pylint: disable=wrong-import-position
+from app.log_pipeline import LogPipeline
+
+LogPipeline.configure()
+
+from flask import Flask
+from flask_cors import CORS
+
+from app.api import clickwrap, requests, common, auth, metrics
+from app.session_store import ServerSessionInterface
+# pylint: enable=wrong-import-position
+
 URL_PREFIX = '/api'
 
 app = Flask(__name__)
 app.config.from_pyfile("config.py")
 
 # Add server-side session config
+# SESSION_BACKEND is one of "sqlite", "memory" (single process only) or "filesystem" (Flask-Session)
 app.config.update(
-    SESSION_TYPE="filesystem",             
+    SESSION_BACKEND=os.environ.get("SESSION_BACKEND", "sqlite"),
+    SESSION_TTL_IN_SECONDS=int(os.environ.get("SESSION_TTL_IN_SECONDS", 24 * 60 * 60)),
+    SESSION_MEMORY_MAX_ENTRIES=int(os.environ.get("SESSION_MEMORY_MAX_ENTRIES", 10000)),
+    SESSION_SQLITE_PATH=os.environ.get(
+        "SESSION_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "insurance_sessions.db")
+    ),
+    SESSION_TYPE="filesystem",
     SESSION_FILE_DIR="/tmp/flask_session",
     SESSION_PERMANENT=False,
     SESSION_USE_SIGNER=True,
-    SESSION_COOKIE_NAME="sid"        
+    SESSION_COOKIE_NAME="sid"
 )
 
-Session(app) 
+if app.config["SESSION_BACKEND"] == "filesystem":
+    from flask_session import Session  # pylint: disable=import-outside-toplevel
+    Session(app)
+else:
+    app.session_interface = ServerSessionInterface.from_config(app.config)
 
+# Registered first so that its request timer runs before the other request hooks
+app.register_blueprint(metrics)
 app.register_blueprint(clickwrap, url_prefix=URL_PREFIX)
 app.register_blueprint(common, url_prefix=URL_PREFIX)
 app.register_blueprint(requests, url_prefix=URL_PREFIX)
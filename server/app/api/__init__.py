@@ -2,3 +2,4 @@ from app.api.clickwrap import clickwrap
 from app.api.common import common
 from app.api.requests import requests
 from app.api.auth import auth
+from app.api.metrics import metrics
@@ -1,14 +1,14 @@
 import logging
-from docusign_esign import ApiException
 from flask import Blueprint, jsonify, request, redirect, url_for, session
 from flask_cors import cross_origin
 
+from app import sdk
 from app.ds_client import DsClient
+from app.payment_gateway_cache import PaymentGatewayCache
+from app.token_manager import TokenManager
 from .utils import process_error
 from .session_data import SessionData
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 auth = Blueprint('auth', __name__)
@@ -22,7 +22,7 @@ def code_grant_auth():
         logger.info("Initiating code grant authorization")
         url = DsClient.get_redirect_uri()
         logger.info("Code grant authorization URL generated: %s", url)
-    except ApiException as exc:
+    except sdk.ApiException as exc:
         logger.error("Error during code grant authorization: %s", str(exc))
         return process_error(exc)
 
@@ -39,20 +39,21 @@ def callback():
     """Handles OAuth callback"""
     try:
         req_json = request.get_json(force=True)
-        logger.info("Received callback request: %s", req_json)
+        logger.info("Received callback request")
     except TypeError:
         logger.error("Invalid JSON input during callback")
         return jsonify(message='Invalid json input'), 400
 
     try:
-        logger.info("Processing OAuth callback with code: %s", req_json['code'])
+        logger.info("Processing OAuth callback")
         auth_data = DsClient.callback(req_json['code'])
-        logger.info("OAuth callback successful, auth data: %s", auth_data)
-    except ApiException as exc:
+        logger.info("OAuth callback successful for account %s", auth_data['account_id'])
+    except sdk.ApiException as exc:
         logger.warning("OAuth callback failed, redirecting to JWT auth: %s", str(exc))
         return redirect(url_for("auth.jwt_auth"), code=307)
 
     SessionData.set_auth_data(auth_data)
+    PaymentGatewayCache.warm(auth_data['account_id'], auth_data['access_token'], background=True)
     logger.info("Session data updated successfully after OAuth callback")
     return jsonify(message="Logged in with code grant"), 200
 
@@ -63,14 +64,15 @@ def jwt_auth():
     """Handles JWT Authentication"""
     try:
         logger.info("Initiating JWT authentication")
-        auth_data = DsClient.update_token()
-        logger.info("JWT authentication successful, auth data: %s", auth_data)
-    except ApiException as exc:
+        auth_data = TokenManager.get_auth_data()
+        logger.info("JWT authentication successful for account %s", auth_data['account_id'])
+    except sdk.ApiException as exc:
         logger.error("Error during JWT authentication: %s", str(exc))
         return process_error(exc)
 
     SessionData.set_auth_data(auth_data)
     SessionData.set_payment_data()
+    PaymentGatewayCache.warm(auth_data['account_id'], auth_data['access_token'], background=True)
     logger.info("Session data and payment data updated successfully after JWT auth")
     return jsonify(message="Logged in with JWT"), 200
 
@@ -97,12 +99,14 @@ def log_out():
 @auth.route('/check_payment', methods=['GET'])
 @cross_origin()
 def check_payment():
-    """Checks if the user has a payment gateway account"""
+    """Checks if the user has a payment gateway account, refresh=true skips the cached result"""
+    if request.args.get('refresh') == 'true':
+        PaymentGatewayCache.invalidate(session.get('account_id'))
     try:
         logger.info("Checking user's payment gateway account")
-        payment_data = DsClient.check_payment_gateway(session)
+        payment_data = PaymentGatewayCache.get(session.get('account_id'), session.get('access_token'))
         logger.info("Payment gateway check response: %s", payment_data)
-    except ApiException as exc:
+    except sdk.ApiException as exc:
         logger.error("Error during payment gateway check: %s", str(exc))
         return process_error(exc)
 
@@ -1,7 +1,7 @@
-from docusign_esign import ApiException
 from flask import Blueprint, jsonify, request, session
 from flask_cors import cross_origin
 
+from app import sdk
 from app.api.utils import process_error, check_token
 from app.clickwrap import Clickwrap
 
@@ -25,6 +25,6 @@ def insurance_renewal():
 
     try:
         clickwrap_ = Clickwrap.create(clickwrap_args, session)
-    except ApiException as exc:
+    except sdk.ApiException as exc:
         return process_error(exc)
     return jsonify(clickwrap=clickwrap_)
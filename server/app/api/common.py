@@ -1,8 +1,39 @@
+import os
+
 from flask import Blueprint, jsonify, request
 
+from app.api.utils import process_error
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.http_cache import HttpCache
+from app.scheduler import OutboundScheduler
+
 common = Blueprint('common', __name__)
 
+# Endpoints that accept a payload other than JSON
+NON_JSON_ENDPOINTS = {'requests.send_bulk_renewal'}
+
 @common.before_app_request
 def only_json(): # pylint: disable-msg=inconsistent-return-statements
-    if request.method == 'POST' and not request.is_json:
+    if request.method == 'POST' and not request.is_json and request.endpoint not in NON_JSON_ENDPOINTS:
         return jsonify({'error': 'Payload should be a JSON'}), 400
+
+
+@common.after_app_request
+def compress_response(response):
+    return HttpCache.compress(response)
+
+
+@common.app_errorhandler(CircuitOpenError)
+def circuit_open(exc):
+    """Calls failing fast on an open circuit are answered with 503 and Retry-After"""
+    return process_error(exc)
+
+
+@common.route('/outbound', methods=['GET'])
+def outbound_state():
+    """Circuit breaker state and API quota estimate of the Docusign hosts in this worker"""
+    return jsonify({
+        'pid': os.getpid(),
+        'circuits': CircuitBreaker.state(),
+        'quotas': OutboundScheduler.state()
+    })
@@ -0,0 +1,28 @@
+import time
+
+from flask import Blueprint, Response, g, request
+
+from app.metrics import Metrics
+
+metrics = Blueprint('metrics', __name__)
+
+
+@metrics.before_app_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@metrics.after_app_request
+def observe_request(response):
+    start = g.get('request_start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        Metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - start)
+    return response
+
+
+@metrics.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics of all workers"""
+    data, content_type = Metrics.render()
+    return Response(data, content_type=content_type)
@@ -1,20 +1,36 @@
+import io
 import os
-from docusign_esign import ApiException
-from flask import Blueprint, jsonify, request, session
+import json
+import logging
+import time
+from flask import Blueprint, Response, jsonify, request, session, stream_with_context
 from flask_cors import cross_origin
 
-from app.api.utils import process_error, check_token
+from app import sdk
+from app.api.utils import process_error, check_token, check_connect_signature
+from app.bulk_renewal import BulkRenewal
+from app.claim_batch import ClaimBatch
 from app.document import DsDocument
+from app.ds_config import BATCH_MAX_CLAIMS, HISTORY_RETENTION_IN_DAYS
 from app.envelope import Envelope
-from app.extensions import Extensions
+from app.envelope_registry import EnvelopeRegistry
+from app.extension_cache import ExtensionCache
+from app.http_cache import HttpCache
+from app.status_store import EnvelopeStatusStore
 
 from .session_data import SessionData
-from app.ds_config import CONNECTED_FIELDS_BASE_HOST
-import json
 
 
+logger = logging.getLogger(__name__)
+
 requests = Blueprint('requests', __name__)
 
+
+def register_envelope(envelope_id):
+    """Registers the sent envelope for the current user"""
+    EnvelopeRegistry.add(SessionData.get_user_key(), session.get('account_id'), envelope_id)
+
+
 @requests.route('/extensionApps', methods=['GET'])
 @cross_origin()
 def extension_apps():
@@ -24,19 +40,9 @@ def extension_apps():
     account_id = session.get('account_id')
 
     try:
-        extensions = Extensions.getExtensions(account_id, access_token, CONNECTED_FIELDS_BASE_HOST)
-
-        session['extensions'] = json.dumps(extensions)
-        actual_app_ids = [item["appId"] for item in extensions]
-
-        address_extension_id = Extensions.getAddressExtensionId()
-        email_extension_ids = Extensions.getEmailExtensionIds()
-
-        has_required_app = address_extension_id in actual_app_ids
-        has_at_least_one_optional = any(app_id in actual_app_ids for app_id in email_extension_ids)
-
-        has_all_app_ids = has_required_app and has_at_least_one_optional
-    except ApiException as exc:
+        extensions = ExtensionCache.get(account_id, access_token)
+        has_all_app_ids = extensions.has_required_apps()
+    except sdk.ApiException as exc:
         return process_error(exc)
     return jsonify({'areExtensionsPresent': has_all_app_ids})
 
@@ -64,23 +70,130 @@ def submit_claim():
         if useWithoutExtension == True:
             envelope = DsDocument.create_claim_without_extension('submit-claim.html', claim, envelope_args)
         else:
-            extensions = json.loads(session.get('extensions'))
+            extensions = ExtensionCache.get(session.get('account_id'), session.get('access_token'))
             envelope = DsDocument.create_claim('submit-claim.html', claim, envelope_args, extensions)
         # Submit envelope to the Docusign
         envelope_id = Envelope.send(envelope, session)
-    except ApiException as exc:
+    except sdk.ApiException as exc:
         return process_error(exc)
 
-    SessionData.set_ds_documents(envelope_id)
+    register_envelope(envelope_id)
 
     try:
         # Get the recipient view
         result = Envelope.get_view(envelope_id, envelope_args, claim, session)
-    except ApiException as exc:
+    except sdk.ApiException as exc:
         return process_error(exc)
     return jsonify({'envelope_id': envelope_id, 'redirect_url': result.url})
 
 
+@requests.route('/requests/claims/batch', methods=['POST'])
+@cross_origin()
+@check_token
+def submit_claims_batch():
+    """Submit many claims at once, results are streamed as NDJSON as each claim is done"""
+    try:
+        req_json = request.get_json(force=True)
+    except TypeError:
+        return jsonify(message='Invalid JSON input'), 400
+
+    claims = req_json.get('claims')
+    if not isinstance(claims, list) or not claims or not all(isinstance(claim, dict) for claim in claims):
+        return jsonify(message='claims should be a non-empty list of claims'), 400
+    if len(claims) > BATCH_MAX_CLAIMS:
+        return jsonify(message=f'A batch can contain at most {BATCH_MAX_CLAIMS} claims'), 400
+
+    envelope_args = {
+        'signer_client_id': 1000,
+        'ds_return_url': req_json['callback-url'],
+    }
+    batch_session = {
+        'access_token': session.get('access_token'),
+        'account_id': session.get('account_id')
+    }
+
+    extensions = None
+    if not all(claim.get('useWithoutExtension') for claim in claims):
+        try:
+            extensions = ExtensionCache.get(batch_session['account_id'], batch_session['access_token'])
+        except sdk.ApiException as exc:
+            return process_error(exc)
+
+    results = ClaimBatch.process(
+        claims, envelope_args, batch_session, extensions,
+        include_views=req_json.get('include_views', True)
+    )
+
+    # The session is saved before the results are streamed
+    user_key = SessionData.get_user_key()
+
+    def stream():
+        summary = {'sent': 0, 'failed': 0}
+        for result in results:
+            if result['status'] == 'sent':
+                EnvelopeRegistry.add(user_key, batch_session['account_id'], result['envelope_id'])
+            summary[result['status']] += 1
+            yield json.dumps(result) + '\n'
+        yield json.dumps({'summary': summary}) + '\n'
+
+    return Response(stream_with_context(stream()), mimetype='application/x-ndjson')
+
+
+@requests.route('/requests/renewals/bulk', methods=['POST'])
+@cross_origin()
+@check_token
+def send_bulk_renewal():
+    """Send renewal notices to the policyholders of the uploaded CSV through the Bulk Send API"""
+    if request.mimetype != 'text/csv':
+        return jsonify({'error': 'Payload should be a CSV'}), 400
+
+    notice = {
+        'title': request.args.get('title', 'Your policy renewal'),
+        'message': request.args.get(
+            'message', 'Your policy is due for renewal. Please review the details below and sign to renew it.'
+        ),
+        'campaign': request.args.get('campaign') or BulkRenewal.campaign_name()
+    }
+    # The CSV is parsed while it is uploaded instead of being read into memory
+    lines = io.TextIOWrapper(request.stream, encoding=request.mimetype_params.get('charset', 'utf-8-sig'), newline='')
+
+    try:
+        summary = BulkRenewal.send(lines, notice, session)
+    except ValueError as exc:
+        return jsonify(message=str(exc)), 400
+    except sdk.ApiException as exc:
+        return process_error(exc)
+
+    SessionData.add_bulk_batches(batch['batch_id'] for batch in summary['batches'])
+    return jsonify(summary)
+
+
+@requests.route('/requests/renewals/bulk', methods=['GET'])
+@cross_origin()
+@check_token
+def bulk_renewal_list():
+    """Request for the bulk renewal batches sent by the user"""
+    try:
+        batches = BulkRenewal.list_batches(session, set(SessionData.get_bulk_batches()))
+    except sdk.ApiException as exc:
+        return process_error(exc)
+    return jsonify({'batches': batches})
+
+
+@requests.route('/requests/renewals/bulk/<batch_id>', methods=['GET'])
+@cross_origin()
+@check_token
+def bulk_renewal_status(batch_id):
+    """Request for the progress of a bulk renewal batch"""
+    if batch_id not in SessionData.get_bulk_batches():
+        return jsonify(message='Batch not found'), 404
+    try:
+        status = BulkRenewal.get_status(batch_id, session)
+    except sdk.ApiException as exc:
+        return process_error(exc)
+    return jsonify(status)
+
+
 @requests.route('/requests/newinsurance', methods=['POST'])
 @cross_origin()
 @check_token
@@ -95,7 +208,7 @@ def buy_new_insurance():
     useWithoutExtension = req_json['useWithoutExtension']
     user = req_json['user']
 
-    print("useWithoutExtension:", useWithoutExtension)
+    logger.debug("New insurance requested, useWithoutExtension: %s", useWithoutExtension)
 
     envelope_args = {
         'signer_client_id': 1000,
@@ -113,21 +226,21 @@ def buy_new_insurance():
             'new-insurance.html', user, insurance_info, envelope_args
         )
         else:
-            extensions = json.loads(session.get('extensions'))
+            extensions = ExtensionCache.get(session.get('account_id'), session.get('access_token'))
             envelope = DsDocument.create_with_payment(
                 'new-insurance.html', user, insurance_info, envelope_args, extensions
             )
         # Submit envelope to the Docusign
         envelope_id = Envelope.send(envelope, session)
-    except ApiException as exc:
+    except sdk.ApiException as exc:
         return process_error(exc)
 
-    SessionData.set_ds_documents(envelope_id)
+    register_envelope(envelope_id)
 
     try:
         # Get the recipient view
         result = Envelope.get_view(envelope_id, envelope_args, user, session)
-    except ApiException as exc:
+    except sdk.ApiException as exc:
         return process_error(exc)
     return jsonify({'envelope_id': envelope_id, 'redirect_url': result.url})
 
@@ -143,13 +256,23 @@ def envelope_list():
     except TypeError:
         return jsonify(message='Invalid JSON input'), 400
 
-    user_documents = session.get('ds_documents', [])
+    user_documents = EnvelopeRegistry.list_ids(
+        SessionData.get_user_key(),
+        session.get('account_id'),
+        created_from=time.time() - HISTORY_RETENTION_IN_DAYS * 24 * 60 * 60
+    )
 
     try:
         envelopes = Envelope.list(envelope_args, user_documents, session)
-    except ApiException as exc:
+    except sdk.ApiException as exc:
         return process_error(exc)
-    return jsonify({'envelopes': envelopes})
+
+    # Unchanged history is not serialized again
+    etag = Envelope.history_etag(envelopes, envelope_args['from_date'])
+    not_modified = HttpCache.not_modified(etag)
+    if not_modified:
+        return not_modified
+    return HttpCache.tag(jsonify({'envelopes': envelopes}), etag)
 
 
 @requests.route('/requests/download', methods=['GET'])
@@ -165,8 +288,25 @@ def envelope_download():
     except TypeError:
         return jsonify(message="Invalid JSON input"), 400
 
+    if not EnvelopeRegistry.contains(
+        SessionData.get_user_key(), session.get('account_id'), envelope_args['envelope_id']
+    ):
+        return jsonify(message='Envelope not found'), 404
+
     try:
         envelope_file = Envelope.download(envelope_args, session)
-    except ApiException as exc:
+    except sdk.ApiException as exc:
         return process_error(exc)
     return envelope_file
+
+
+@requests.route('/requests/connect', methods=['POST'])
+@check_connect_signature
+def connect_event():
+    """Receives Docusign Connect envelope and recipient events"""
+    try:
+        event = json.loads(request.get_data())
+        envelope_id = EnvelopeStatusStore.save_connect_event(event)
+    except ValueError:
+        return jsonify(message='Invalid Connect event'), 400
+    return jsonify({'envelope_id': envelope_id})
@@ -1,9 +1,10 @@
 import os
+import secrets
 
 from datetime import datetime
 from flask import session
 
-from app.ds_config import TOKEN_REPLACEMENT_IN_SECONDS
+from app.ds_config import TOKEN_REPLACEMENT_IN_SECONDS, BULK_BATCHES_IN_SESSION
 
 
 class SessionData:
@@ -19,6 +20,7 @@ class SessionData:
         session['access_token'] = auth_data['access_token']
         session['account_id'] = auth_data['account_id']
         session['auth_type'] = auth_data['auth_type']
+        session['user_id'] = auth_data.get('user_id')
         session['expires_date'] = expires_date
 
     @staticmethod
@@ -37,10 +39,25 @@ class SessionData:
         return expires_date and expires_date > date_now + TOKEN_REPLACEMENT_IN_SECONDS
 
     @staticmethod
-    def set_ds_documents(envelope_id):
-        if not session.get('ds_documents'):
-            session['ds_documents'] = [envelope_id]
-        else:
-            documents = session['ds_documents']
-            documents.append(envelope_id)
-            session['ds_documents'] = documents
+    def get_user_key():
+        """
+        Returns the key the envelopes of the current user are registered under.
+        Code grant users are identified by their Docusign user ID, with JWT
+        all users share the impersonated user, so the history is kept per session
+        under a random ID issued by the server
+        """
+        if session.get('auth_type') == 'code_grant' and session.get('user_id'):
+            return f"user:{session['user_id']}"
+        if 'history_id' not in session:
+            session['history_id'] = secrets.token_urlsafe(16)
+        return f"session:{session['history_id']}"
+
+    @staticmethod
+    def add_bulk_batches(batch_ids):
+        """Remembers the bulk send batches sent by the user, the most recent ones are kept"""
+        batches = session.get('bulk_batches', []) + list(batch_ids)
+        session['bulk_batches'] = batches[-BULK_BATCHES_IN_SESSION:]
+
+    @staticmethod
+    def get_bulk_batches():
+        return session.get('bulk_batches', [])
@@ -1,16 +1,21 @@
+import base64
+import hashlib
+import hmac
 from functools import wraps
 
-from flask import jsonify, redirect, url_for, session
+from flask import jsonify, redirect, request, url_for, session
 
-from app.ds_client import DsClient
-from app.ds_config import PERMISSION_SCOPES, DS_RETURN_URL, DS_AUTH_SERVER
+from app.token_manager import TokenManager
+from app.ds_config import PERMISSION_SCOPES, DS_RETURN_URL, DS_AUTH_SERVER, CONNECT_HMAC_KEYS
 
 
 from .session_data import SessionData
 
 
 def process_error(err):
-    """Special handling for consent_required"""
+    """Special handling for consent_required and for the rate limited or
+    unavailable Docusign API, whose status and Retry-After are passed on
+    """
     body = err.body.decode('utf8')
     if "consent_required" in body:
         client_id = session.get('account_id')
@@ -23,6 +28,13 @@ def process_error(err):
             'response': 'Permissions should be granted for current integration',
             'url': consent_url}), 401
 
+    if err.status in (429, 503):
+        headers = {}
+        retry_after = (err.headers or {}).get('Retry-After')
+        if retry_after:
+            headers['Retry-After'] = retry_after
+        return jsonify({'reason': err.reason, 'response': body}), err.status, headers
+
     return jsonify({
         'reason': err.reason,
         'response': err.body.decode('utf8')
@@ -34,7 +46,7 @@ def check_token(func):
     def wrapper(*args, **kwargs):
 
         if session.get('auth_type') == 'jwt':
-            DsClient.update_token()
+            SessionData.set_auth_data(TokenManager.get_auth_data())
 
         if not SessionData.is_logged():
             return redirect(url_for("auth.code_grant_auth"))
@@ -42,3 +54,24 @@ def check_token(func):
         return func(*args, **kwargs)
 
     return wrapper
+
+
+def check_connect_signature(func):
+    """Rejects Connect requests that are not signed with one of the HMAC keys"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        payload = request.get_data()
+        signatures = [
+            value for header, value in request.headers.items()
+            if header.lower().startswith('x-docusign-signature-')
+        ]
+
+        for key in CONNECT_HMAC_KEYS:
+            digest = hmac.new(key.encode('utf-8'), payload, hashlib.sha256).digest()
+            expected = base64.b64encode(digest).decode('ascii')
+            if any(hmac.compare_digest(expected, signature) for signature in signatures):
+                return func(*args, **kwargs)
+
+        return jsonify(message='Invalid Connect signature'), 401
+
+    return wrapper
@@ -0,0 +1,171 @@
+import csv
+import logging
+import re
+from datetime import datetime, timezone
+
+from app import sdk
+from app.circuit_breaker import CircuitOpenError
+from app.document import DsDocument
+from app.ds_client import DsClient
+from app.ds_config import BULK_SEND_LIST_SIZE, BULK_SEND_MAX_REJECTED_ROWS
+from app.envelope_builder import EnvelopeBuilder
+from app.metrics import Metrics
+from app.scheduler import OutboundScheduler
+
+logger = logging.getLogger(__name__)
+
+_EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+class BulkRenewal:
+    """
+    Sends renewal notices to many policyholders through the Bulk Send API.
+    One draft envelope is created per BULK_SEND_LIST_SIZE policyholders and
+    sent to all of them with a single bulk send request, instead of one
+    create_envelope call per policyholder. The CSV is read while it is
+    uploaded, only one list of policyholders is kept in memory
+    """
+    RENEWAL_TEMPLATE = 'renewal-notice.html'
+    REQUIRED_COLUMNS = ('first_name', 'last_name', 'email')
+    TAB_COLUMNS = ('policy_number', 'renewal_date', 'premium')
+
+    @classmethod
+    def send(cls, lines, notice, session):
+        """Sends the renewal notice to every valid row of the CSV
+        Parameters:
+            lines (iterable): Lines of a CSV with a header row, the columns are
+                first_name, last_name, email and optionally policy_number,
+                renewal_date and premium
+            notice (dict): Title and message of the notice and the campaign name
+            session (dict): Access token and account ID
+        Returns:
+            dict with the submitted batches and the rejected rows
+        """
+        reader = csv.DictReader(lines)
+        missing = [column for column in cls.REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"The CSV is missing the columns: {', '.join(missing)}")
+
+        ds_client = DsClient.get_configured_instance(session.get('access_token'))
+        account_id = session.get('account_id')
+        envelope = DsDocument.create_renewal_notice(cls.RENEWAL_TEMPLATE, notice)
+
+        summary = {'batches': [], 'accepted': 0, 'rejected': 0, 'rejected_rows': []}
+        copies = []
+        for line_number, row in enumerate(reader, start=2):
+            error = cls._validate(row)
+            if error:
+                summary['rejected'] += 1
+                if len(summary['rejected_rows']) < BULK_SEND_MAX_REJECTED_ROWS:
+                    summary['rejected_rows'].append({'line': line_number, 'error': error})
+                continue
+            row = {column: (value or '').strip() for column, value in row.items()}
+            copies.append(EnvelopeBuilder.bulk_copy(
+                row, {column: row[column] for column in cls.TAB_COLUMNS if row.get(column)}
+            ))
+            if len(copies) == BULK_SEND_LIST_SIZE:
+                if not cls._submit_chunk(ds_client, account_id, envelope, copies, notice, summary):
+                    return summary
+                copies = []
+        if copies:
+            cls._submit_chunk(ds_client, account_id, envelope, copies, notice, summary)
+        return summary
+
+    @classmethod
+    def _submit_chunk(cls, ds_client, account_id, envelope, copies, notice, summary):
+        """Submits one bulk send list, the rest of the CSV is not sent once a list fails
+        Returns:
+            True when the list was submitted
+        """
+        try:
+            summary['batches'].append(cls._submit(ds_client, account_id, envelope, copies, notice, summary))
+        except (sdk.ApiException, CircuitOpenError) as exc:
+            if not summary['batches']:
+                raise
+            # The earlier batches are queued already, they are reported with the error
+            logger.warning('Bulk send stopped after %s batches with status %s', len(summary['batches']), exc.status)
+            body = exc.body.decode('utf-8', errors='replace') if isinstance(exc.body, bytes) else exc.body
+            summary['error'] = {'status': exc.status, 'body': body}
+            return False
+        return True
+
+    @staticmethod
+    @Metrics.track_call('bulk_send_status')
+    @OutboundScheduler.priority('low')
+    def get_status(batch_id, session):
+        """Returns the progress of a bulk send batch"""
+        ds_client = DsClient.get_configured_instance(session.get('access_token'))
+        bulk_api = sdk.BulkEnvelopesApi(ds_client)
+        status = bulk_api.get_bulk_send_batch_status(session.get('account_id'), batch_id)
+        return {
+            'batch_id': status.batch_id,
+            'batch_name': status.batch_name,
+            'batch_size': status.batch_size,
+            'queued': status.queued,
+            'sent': status.sent,
+            'failed': status.failed,
+            'submitted_date': status.submitted_date,
+            'errors': [error.to_dict() for error in status.bulk_errors or []]
+        }
+
+    @staticmethod
+    @Metrics.track_call('bulk_send_list')
+    @OutboundScheduler.priority('low')
+    def list_batches(session, batch_ids=None):
+        """Returns the bulk send batches of the account
+        Parameters:
+            batch_ids (set): Only these batches are returned when given
+        """
+        ds_client = DsClient.get_configured_instance(session.get('access_token'))
+        bulk_api = sdk.BulkEnvelopesApi(ds_client)
+        summaries = bulk_api.get_bulk_send_batches(session.get('account_id'))
+        return [
+            summary.to_dict() for summary in summaries.bulk_batch_summaries or []
+            if batch_ids is None or summary.batch_id in batch_ids
+        ]
+
+    @classmethod
+    def _validate(cls, row):
+        if None in row:
+            return 'Too many fields'
+        for column in cls.REQUIRED_COLUMNS:
+            if not (row.get(column) or '').strip():
+                return f'Missing {column}'
+        if not _EMAIL_PATTERN.match(row['email'].strip()):
+            return 'Invalid email'
+        return None
+
+    @staticmethod
+    @Metrics.track_call('bulk_send')
+    def _submit(ds_client, account_id, envelope, copies, notice, summary):
+        """Creates the bulk send list of the copies, its draft envelope and the bulk send request"""
+        bulk_api = sdk.BulkEnvelopesApi(ds_client)
+        envelope_api = sdk.EnvelopesApi(ds_client)
+        batch_name = f"{notice['campaign']}-{len(summary['batches']) + 1}"
+
+        bulk_list = bulk_api.create_bulk_send_list(
+            account_id, bulk_sending_list={'name': batch_name, 'bulkCopies': copies}
+        )
+        draft = envelope_api.create_envelope(
+            account_id,
+            envelope_definition=dict(envelope, customFields=EnvelopeBuilder.mailing_list_field(bulk_list.list_id))
+        )
+        response = bulk_api.create_bulk_send_request(
+            account_id, bulk_list.list_id,
+            bulk_send_request={'envelopeOrTemplateId': draft.envelope_id, 'batchName': batch_name}
+        )
+        summary['accepted'] += len(copies)
+        logger.info('Submitted bulk send batch %s of %s recipients', response.batch_id, len(copies))
+        return {
+            'batch_id': response.batch_id,
+            'batch_name': batch_name,
+            'batch_size': response.batch_size or len(copies),
+            'list_id': bulk_list.list_id,
+            'envelope_id': draft.envelope_id,
+            'queue_limit': response.queue_limit,
+            'total_queued': response.total_queued
+        }
+
+    @staticmethod
+    def campaign_name():
+        return 'renewal-' + datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
@@ -0,0 +1,193 @@
+import collections
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from app.ds_config import (
+    BREAKER_WINDOW_IN_SECONDS,
+    BREAKER_MIN_CALLS,
+    BREAKER_ERROR_RATE,
+    BREAKER_SLOW_CALL_IN_SECONDS,
+    BREAKER_SLOW_RATE,
+    BREAKER_OPEN_IN_SECONDS,
+    BREAKER_HALF_OPEN_PROBES
+)
+from app.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """
+    The call was not sent, the circuit of the host is open.
+    It carries the status, reason, body and headers of an ApiException,
+    so it is reported like a 503 response of the host
+    """
+    status = 503
+    reason = 'Service Unavailable'
+
+    def __init__(self, host, retry_after):
+        message = f'Calls to {host} are suspended after repeated failures, retry after {retry_after} seconds'
+        super().__init__(message)
+        self.host = host
+        self.retry_after = retry_after
+        self.body = json.dumps({'errorCode': 'CIRCUIT_OPEN', 'message': message}).encode('utf-8')
+        self.headers = {'Retry-After': str(retry_after)}
+
+
+class _HostCircuit:
+    """
+    Circuit of one host. Closed, the outcomes of the calls of the last
+    BREAKER_WINDOW_IN_SECONDS are kept and the circuit opens when too many
+    failed or were slow. Open, calls fail immediately. After BREAKER_OPEN_IN_SECONDS
+    it is half-open, a few probe calls are let through and close it when they succeed
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.state = 'closed'
+        self.calls = collections.deque()
+        self.opened_at = None
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+
+    def acquire(self, now):
+        """Admits a call
+        Returns:
+            True when the call is a half-open probe
+        Raises:
+            CircuitOpenError when the call is not admitted
+        """
+        if self.state == 'open':
+            remaining = self.opened_at + BREAKER_OPEN_IN_SECONDS - now
+            if remaining > 0:
+                raise CircuitOpenError(self.host, max(1, int(remaining + 0.999)))
+            self.state = 'half_open'
+            self.probes_in_flight = 0
+            self.probe_successes = 0
+        if self.state == 'half_open':
+            if self.probes_in_flight >= BREAKER_HALF_OPEN_PROBES:
+                raise CircuitOpenError(self.host, 1)
+            self.probes_in_flight += 1
+            return True
+        return False
+
+    def record(self, now, probe, failed, slow):
+        """Records the outcome of a call
+        Returns:
+            the new state when the call changed it
+        """
+        if probe:
+            self.probes_in_flight -= 1
+            if failed or slow:
+                return self._open(now)
+            self.probe_successes += 1
+            if self.probe_successes >= BREAKER_HALF_OPEN_PROBES:
+                self.state = 'closed'
+                self.calls.clear()
+                return 'closed'
+            return None
+        if self.state != 'closed':
+            # Calls that started before the circuit opened
+            return None
+
+        self.calls.append((now, failed, slow))
+        while self.calls and self.calls[0][0] < now - BREAKER_WINDOW_IN_SECONDS:
+            self.calls.popleft()
+        if len(self.calls) < BREAKER_MIN_CALLS:
+            return None
+        failures = sum(1 for _, call_failed, _ in self.calls if call_failed)
+        slow_calls = sum(1 for _, _, call_slow in self.calls if call_slow)
+        if failures / len(self.calls) >= BREAKER_ERROR_RATE or slow_calls / len(self.calls) >= BREAKER_SLOW_RATE:
+            return self._open(now)
+        return None
+
+    def snapshot(self, now):
+        calls = [call for call in self.calls if call[0] >= now - BREAKER_WINDOW_IN_SECONDS]
+        result = {
+            'state': self.state,
+            'calls': len(calls),
+            'failures': sum(1 for _, failed, _ in calls if failed),
+            'slow_calls': sum(1 for _, _, slow in calls if slow)
+        }
+        if self.state == 'open':
+            result['retry_after'] = max(0, round(self.opened_at + BREAKER_OPEN_IN_SECONDS - now, 1))
+        return result
+
+    def _open(self, now):
+        self.state = 'open'
+        self.opened_at = now
+        self.calls.clear()
+        return 'open'
+
+
+class CircuitBreaker:
+    """
+    Per host circuit breakers of the outbound calls, applied by the transport to
+    every request of the SDK clients and of the pooled requests sessions.
+    During an outage of a Docusign host its calls fail fast with CircuitOpenError
+    instead of holding the worker threads until the sockets time out
+    """
+    STATES = ('closed', 'half_open', 'open')
+
+    _circuits = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def call(cls, url, send, status_of):
+        """Sends a request through the circuit of its host
+        Parameters:
+            send (callable): Sends the request and returns the response
+            status_of (callable): Returns the HTTP status of the response
+        Returns:
+            the response
+        Raises:
+            CircuitOpenError when the circuit does not let the call through
+        """
+        host = urlsplit(url).netloc
+        with cls._lock:
+            probe = cls._circuit(host).acquire(time.monotonic())
+
+        start = time.monotonic()
+        try:
+            response = send()
+        except Exception:
+            cls._record(host, probe, True, time.monotonic() - start)
+            raise
+        cls._record(host, probe, status_of(response) >= 500, time.monotonic() - start)
+        return response
+
+    @classmethod
+    def state(cls):
+        """Returns the state of the circuit of every host"""
+        now = time.monotonic()
+        with cls._lock:
+            return {host: circuit.snapshot(now) for host, circuit in cls._circuits.items()}
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._circuits = {}
+
+    @classmethod
+    def _record(cls, host, probe, failed, duration):
+        with cls._lock:
+            state = cls._circuit(host).record(
+                time.monotonic(), probe, failed, duration >= BREAKER_SLOW_CALL_IN_SECONDS
+            )
+        if state is not None:
+            Metrics.set_circuit_state(host, cls.STATES.index(state))
+            if state == 'open':
+                logger.warning('Circuit of %s opened in process %s', host, os.getpid())
+            else:
+                logger.info('Circuit of %s closed', host)
+
+    @classmethod
+    def _circuit(cls, host):
+        circuit = cls._circuits.get(host)
+        if circuit is None:
+            circuit = cls._circuits[host] = _HostCircuit(host)
+        return circuit
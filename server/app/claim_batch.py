@@ -0,0 +1,112 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+import urllib3
+
+from app import sdk
+from app.circuit_breaker import CircuitOpenError
+from app.document import DsDocument
+from app.ds_config import BATCH_MAX_WORKERS
+from app.envelope import Envelope
+
+logger = logging.getLogger(__name__)
+
+
+class ClaimBatch:
+    """
+    Creates the envelopes of many claims concurrently.
+    All batches share one pool of BATCH_MAX_WORKERS threads, so the number
+    of concurrent Docusign calls stays bounded however many batches run
+    """
+    CLAIM_TEMPLATE = 'submit-claim.html'
+
+    _executor = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def process(cls, claims, envelope_args, session, extensions=None, include_views=True):
+        """Submits the claims and yields the result of each one as soon as it is done
+        Parameters:
+            claims (list): Claim dicts as accepted by /requests/claim
+            envelope_args (dict): Parameters of the documents
+            session (dict): Access token and account ID, the Flask session
+                is not available in the worker threads
+            extensions (ExtensionIndex): Connected fields extensions of the account,
+                required for claims that use extensions
+            include_views (bool): Whether to create the recipient views
+        Returns:
+            generator of result dicts in completion order
+        """
+        executor = cls._get_executor()
+        futures = {
+            executor.submit(cls._submit, claim, envelope_args, session, extensions, include_views): index
+            for index, claim in enumerate(claims)
+        }
+        try:
+            for future in as_completed(futures):
+                yield dict(future.result(), index=futures[future])
+        finally:
+            # The client went away, claims that have not started are not submitted
+            for future in futures:
+                future.cancel()
+
+    @classmethod
+    def reset(cls):
+        """Drops the worker threads, they do not survive when the process is forked"""
+        with cls._lock:
+            cls._executor = None
+
+    @classmethod
+    def _get_executor(cls):
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix='claim-batch')
+            return cls._executor
+
+    @classmethod
+    def _submit(cls, claim, envelope_args, session, extensions, include_views):
+        try:
+            return cls._submit_claim(claim, envelope_args, session, extensions, include_views)
+        except Exception as exc:  # pylint: disable=broad-except
+            # One failing claim must not end the stream of the whole batch
+            logger.exception('Batch claim failed')
+            # Errors of the connection to Docusign are reported as a bad gateway
+            status = 502 if isinstance(exc, (urllib3.exceptions.HTTPError, requests.RequestException)) else 500
+            return cls._error(claim, status, f'Claim could not be submitted: {type(exc).__name__}')
+
+    @classmethod
+    def _submit_claim(cls, claim, envelope_args, session, extensions, include_views):
+        try:
+            if claim.get('useWithoutExtension') or extensions is None:
+                envelope = DsDocument.create_claim_without_extension(cls.CLAIM_TEMPLATE, claim, envelope_args)
+            else:
+                envelope = DsDocument.create_claim(cls.CLAIM_TEMPLATE, claim, envelope_args, extensions)
+            envelope_id = Envelope.send(envelope, session)
+        except (sdk.ApiException, CircuitOpenError) as exc:
+            return cls._error(claim, exc.status, exc.body)
+        except (KeyError, TypeError) as exc:
+            return cls._error(claim, 400, f'Invalid claim, missing {exc}')
+
+        result = {'status': 'sent', 'email': claim['email'], 'envelope_id': envelope_id}
+        if include_views:
+            try:
+                result['redirect_url'] = Envelope.get_view(envelope_id, envelope_args, claim, session).url
+            except (sdk.ApiException, CircuitOpenError) as exc:
+                # The envelope was sent, only its signing link is missing
+                result['view_error'] = cls._error_body(exc.body)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception('Recipient view of a batch claim failed')
+                result['view_error'] = f'Signing link could not be created: {type(exc).__name__}'
+        return result
+
+    @classmethod
+    def _error(cls, claim, status, body):
+        logger.warning('Batch claim failed with status %s', status)
+        email = claim.get('email') if isinstance(claim, dict) else None
+        return {'status': 'failed', 'email': email, 'error': {'status': status, 'body': cls._error_body(body)}}
+
+    @staticmethod
+    def _error_body(body):
+        return body.decode('utf-8', errors='replace') if isinstance(body, bytes) else body
@@ -1,4 +1,6 @@
 import base64
+import hashlib
+import os
 from os import path
 
 from app.ds_config import (
@@ -7,28 +9,96 @@ from app.ds_config import (
     CLICKWRAP_BASE_URI
 )
 from app.ds_client import DsClient
+from app.clickwrap_registry import ClickwrapRegistry
+from app.metrics import Metrics
 
 
 class Clickwrap: # pylint: disable=too-few-public-methods
-    @staticmethod
-    def create(args, session):
-        """Creates a clickwrap for an account
+    TERMS_FILE_NAME = 'terms-renewal.docx'
+
+    _terms_document = None
+
+    @classmethod
+    @Metrics.track_call('clickwrap_create')
+    def create(cls, args, session):
+        """Returns an active clickwrap for an account.
+        A clickwrap is created once per terms name and terms document,
+        a new version is added only when the terms document changes
         Parameters:
             args (dict): Parameters for the clickwrap.
         Returns:
-            JSON structure of the created clickwrap.
+            JSON structure of the active clickwrap.
         """
         terms_name = args.get('terms_name')
-        file_name = 'terms-renewal.docx'
         account_id = session.get('account_id')
+        terms_document = cls._get_terms_document()
+
+        clickwrap = ClickwrapRegistry.get(account_id, terms_name, terms_document['sha256'])
+        Metrics.count_cache('clickwrap', clickwrap is not None)
+        if clickwrap is not None:
+            return clickwrap
+
+        with ClickwrapRegistry.lock:
+            clickwrap = ClickwrapRegistry.get(account_id, terms_name, terms_document['sha256'])
+            if clickwrap is not None:
+                return clickwrap
+
+            ds_client = DsClient.get_configured_instance(
+                session.get('access_token'),
+                CLICKWRAP_BASE_HOST
+            )
+            body = cls._create_body(args, terms_document)
 
-        with open(path.join(TPL_PATH, file_name), 'rb') as binary_file:
-            binary_file_data = binary_file.read()
-            base64_encoded_data = base64.b64encode(binary_file_data)
-            base64_terms = base64_encoded_data.decode('utf-8')
+            previous = ClickwrapRegistry.get_latest(account_id, terms_name)
+            if previous is None:
+                # Make a POST call to the clickwraps endpoint to create a clickwrap for an account
+                uri = f"{CLICKWRAP_BASE_URI}/{account_id}/clickwraps"
+            else:
+                # The terms document has changed, add a new version of the clickwrap
+                uri = f"{CLICKWRAP_BASE_URI}/{account_id}/clickwraps/{previous['clickwrap_id']}/versions"
+            response = ds_client.call_api(
+                uri, 'POST', body=body, response_type='object'
+            )
+
+            clickwrap_id = response[0].get('clickwrapId') or previous['clickwrap_id']
+            version_number = response[0].get('versionNumber') or 1
+
+            # Make a PUT call to the clickwraps endpoint to activate the created version
+            uri = f"{CLICKWRAP_BASE_URI}/{account_id}/clickwraps/{clickwrap_id}/versions/{version_number}"
+            response_active = ds_client.call_api(
+                uri, 'PUT', body={'status': 'active'}, response_type='object'
+            )
+
+            ClickwrapRegistry.register(
+                account_id, terms_name, terms_document['sha256'],
+                clickwrap_id, version_number, response_active[0]
+            )
+        return response_active[0]
 
-        # Construct clickwrap JSON body
-        body = {
+    @classmethod
+    def _get_terms_document(cls):
+        """Reads the terms document, it is read again only when the file changes"""
+        file_path = path.join(TPL_PATH, cls.TERMS_FILE_NAME)
+        mtime = os.stat(file_path).st_mtime_ns
+
+        terms_document = cls._terms_document
+        if terms_document is None or terms_document['mtime'] != mtime:
+            with open(file_path, 'rb') as binary_file:
+                binary_file_data = binary_file.read()
+            terms_document = {
+                'mtime': mtime,
+                'base64': base64.b64encode(binary_file_data).decode('utf-8'),
+                'sha256': hashlib.sha256(binary_file_data).hexdigest()
+            }
+            cls._terms_document = terms_document
+        return terms_document
+
+    @classmethod
+    def _create_body(cls, args, terms_document):
+        """Constructs clickwrap JSON body"""
+        terms_name = args.get('terms_name')
+        file_name = cls.TERMS_FILE_NAME
+        return {
             'displaySettings': {
                 'consentButtonText': 'I Agree',
                 'displayName': args.get('display_name'),
@@ -42,7 +112,7 @@ class Clickwrap: # pylint: disable=too-few-public-methods
             },
             'documents': [
                 {
-                    'documentBase64': base64_terms,
+                    'documentBase64': terms_document['base64'],
                     'documentName': terms_name,
                     'fileExtension': file_name[file_name.rfind('.')+1:],
                     'order': 0
@@ -51,23 +121,3 @@ class Clickwrap: # pylint: disable=too-few-public-methods
             'name': terms_name,
             'requireReacceptance': True
         }
-
-        # Make a POST call to the clickwraps endpoint to create a clickwrap for an account
-        ds_client = DsClient.get_configured_instance(
-            session.get('access_token'),
-            CLICKWRAP_BASE_HOST
-        )
-
-        uri = f"{CLICKWRAP_BASE_URI}/{account_id}/clickwraps"
-        response = ds_client.call_api(
-            uri, 'POST', body=body, response_type='object'
-        )
-
-        clickwrap_id = response[0].get('clickwrapId')
-
-        # Make a PUT call to the clickwraps endpoint to activate created clickwrap
-        uri = f"{CLICKWRAP_BASE_URI}/{account_id}/clickwraps/{clickwrap_id}/versions/1"
-        response_active = ds_client.call_api(
-            uri, 'PUT', body={'status': 'active'}, response_type='object'
-        )
-        return response_active[0]
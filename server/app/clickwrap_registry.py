@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import threading
+
+from app.ds_config import CLICKWRAP_REGISTRY_PATH
+
+
+class ClickwrapRegistry:
+    """
+    Registry of the clickwraps created by the app.
+    Clickwraps are registered per account, terms name and terms document hash
+    and persisted in CLICKWRAP_REGISTRY_PATH, so they survive restarts
+    and are shared by all worker processes
+    """
+    _entries = None
+    _mtime = None
+    lock = threading.RLock()
+
+    @classmethod
+    def get(cls, account_id, terms_name, document_hash):
+        """Returns the active clickwrap registered for the terms document or None"""
+        entry = cls._find(account_id, terms_name, document_hash)
+        if entry is None:
+            # Another worker may have registered the clickwrap
+            cls._load()
+            entry = cls._find(account_id, terms_name, document_hash)
+        return entry['clickwrap'] if entry else None
+
+    @classmethod
+    def get_latest(cls, account_id, terms_name):
+        """Returns the last entry registered for the terms name regardless of the document"""
+        cls._ensure_loaded()
+        matches = [
+            entry for entry in cls._entries
+            if entry['account_id'] == account_id and entry['terms_name'] == terms_name
+        ]
+        return matches[-1] if matches else None
+
+    @classmethod
+    def register(cls, account_id, terms_name, document_hash, clickwrap_id, version_number, clickwrap):
+        with cls.lock:
+            cls._load()
+            cls._entries.append({
+                'account_id': account_id,
+                'terms_name': terms_name,
+                'document_hash': document_hash,
+                'clickwrap_id': clickwrap_id,
+                'version_number': version_number,
+                'clickwrap': clickwrap
+            })
+            cls._save()
+
+    @classmethod
+    def _find(cls, account_id, terms_name, document_hash):
+        cls._ensure_loaded()
+        for entry in reversed(cls._entries):
+            if (entry['account_id'], entry['terms_name'], entry['document_hash']) == \
+                    (account_id, terms_name, document_hash):
+                return entry
+        return None
+
+    @classmethod
+    def _ensure_loaded(cls):
+        if cls._entries is None:
+            cls._load()
+
+    @classmethod
+    def _load(cls):
+        with cls.lock:
+            try:
+                mtime = os.stat(CLICKWRAP_REGISTRY_PATH).st_mtime_ns
+            except FileNotFoundError:
+                cls._entries = cls._entries or []
+                return
+            if cls._entries is not None and mtime == cls._mtime:
+                return
+            with open(CLICKWRAP_REGISTRY_PATH, 'r') as file:
+                cls._entries = json.load(file)
+            cls._mtime = mtime
+
+    @classmethod
+    def _save(cls):
+        directory = os.path.dirname(CLICKWRAP_REGISTRY_PATH)
+        os.makedirs(directory, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w') as file:
+            json.dump(cls._entries, file)
+        os.replace(temp_path, CLICKWRAP_REGISTRY_PATH)
+        cls._mtime = os.stat(CLICKWRAP_REGISTRY_PATH).st_mtime_ns
@@ -0,0 +1,139 @@
+import copy
+import socket
+import ssl
+import threading
+import time
+
+import certifi
+import requests
+import urllib3
+
+from app import sdk
+from app.ds_config import (
+    CLIENT_POOL_MAXSIZE,
+    CLIENT_POOL_KEEPALIVE_IN_SECONDS,
+    CLIENT_POOL_IDLE_TIMEOUT_IN_SECONDS,
+    CLIENT_POOL_CONNECT_TIMEOUT_IN_SECONDS,
+    CLIENT_POOL_READ_TIMEOUT_IN_SECONDS
+)
+from app.transport import TransportAdapter, TransportPoolManager
+
+
+def _socket_options():
+    """TCP keepalive options for the pooled connections"""
+    options = list(urllib3.connection.HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    # Fine grained keepalive settings are not available on every platform
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, CLIENT_POOL_KEEPALIVE_IN_SECONDS))
+    if hasattr(socket, 'TCP_KEEPINTVL'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, CLIENT_POOL_KEEPALIVE_IN_SECONDS))
+    return options
+
+
+class _KeepAliveAdapter(TransportAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = _socket_options()
+        super().init_poolmanager(*args, **kwargs)
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = (CLIENT_POOL_CONNECT_TIMEOUT_IN_SECONDS, CLIENT_POOL_READ_TIMEOUT_IN_SECONDS)
+        return super().send(request, **kwargs)
+
+
+class ClientPool:
+    """
+    Process-wide pool of Docusign HTTP clients keyed by host.
+    Connections are kept alive and shared between threads, and pools
+    that were not used for CLIENT_POOL_IDLE_TIMEOUT_IN_SECONDS are closed
+    """
+    _clients = {}
+    _sessions = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_client(cls, host, access_token=None):
+        """Returns an ApiClient for the host sharing the pooled connections
+        Parameters:
+            host (str): Base URL the client is configured for
+            access_token (str): Access token sent with the requests of this client
+        Returns:
+            ApiClient that can be used by the current request only
+        """
+        entry = cls._get_entry(cls._clients, host, cls._create_client)
+
+        # The shared client is never mutated, every call gets its own headers
+        client = copy.copy(entry['resource'])
+        client.default_headers = dict(client.default_headers)
+        if access_token:
+            client.default_headers['Authorization'] = f"Bearer {access_token}"
+        return client
+
+    @classmethod
+    def get_session(cls, host):
+        """Returns a requests session with pooled connections to the host"""
+        return cls._get_entry(cls._sessions, host, cls._create_session)['resource']
+
+    @classmethod
+    def preload(cls, hosts):
+        """Creates the clients for the hosts ahead of the first request"""
+        for host in hosts:
+            if host:
+                cls._get_entry(cls._clients, host, cls._create_client)
+
+    @classmethod
+    def reset(cls):
+        """Closes all pooled connections, e.g. after the process was forked.
+        The clients are kept, new connections are opened on their next use
+        """
+        with cls._lock:
+            for entry in cls._clients.values():
+                entry['resource'].rest_client.pool_manager.clear()
+            for entry in cls._sessions.values():
+                entry['resource'].close()
+
+    @classmethod
+    def _get_entry(cls, entries, host, factory):
+        now = time.monotonic()
+        with cls._lock:
+            cls._evict_idle(now)
+            entry = entries.get(host)
+            if entry is None:
+                entry = {'resource': factory(host)}
+                entries[host] = entry
+            entry['last_used'] = now
+        return entry
+
+    @classmethod
+    def _evict_idle(cls, now):
+        for host, entry in list(cls._clients.items()):
+            if now - entry['last_used'] > CLIENT_POOL_IDLE_TIMEOUT_IN_SECONDS:
+                entry['resource'].rest_client.pool_manager.clear()
+                del cls._clients[host]
+        for host, entry in list(cls._sessions.items()):
+            if now - entry['last_used'] > CLIENT_POOL_IDLE_TIMEOUT_IN_SECONDS:
+                entry['resource'].close()
+                del cls._sessions[host]
+
+    @staticmethod
+    def _create_client(host):
+        client = sdk.ApiClient(host=host)
+        client.rest_client.pool_manager = TransportPoolManager(
+            num_pools=4,
+            maxsize=CLIENT_POOL_MAXSIZE,
+            cert_reqs=ssl.CERT_REQUIRED,
+            ca_certs=certifi.where(),
+            socket_options=_socket_options(),
+            timeout=urllib3.Timeout(
+                connect=CLIENT_POOL_CONNECT_TIMEOUT_IN_SECONDS, read=CLIENT_POOL_READ_TIMEOUT_IN_SECONDS
+            )
+        )
+        return client
+
+    @staticmethod
+    def _create_session(host):
+        adapter = _KeepAliveAdapter(pool_connections=1, pool_maxsize=CLIENT_POOL_MAXSIZE)
+        session = requests.Session()
+        session.mount(host, adapter)
+        return session
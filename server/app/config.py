@@ -1,5 +1,7 @@
+import os
+
 # Config for Flask
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', 'False') == 'True'
 SECRET_KEY = '{SESSION_SECRET}'
 
 CORS_SUPPORTS_CREDENTIALS = True
@@ -0,0 +1,135 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app.ds_config import DOCUMENT_CACHE_DIR, DOCUMENT_CACHE_MAX_BYTES
+
+
+class DocumentCache:
+    """
+    Size-bounded, content-addressed on-disk cache of envelope documents.
+    Files are stored under their SHA-256 and the least recently used
+    ones are evicted once the cache grows over DOCUMENT_CACHE_MAX_BYTES
+    """
+    _local = threading.local()
+
+    @classmethod
+    def lookup(cls, key):
+        """Returns the cached document for the key
+        Parameters:
+            key (tuple): Account ID, envelope ID and document ID
+        Returns:
+            dict with the path, sha256, size and created time or None
+        """
+        connection = cls._connection()
+        row = connection.execute(
+            'SELECT sha256, size, created FROM documents WHERE key = ?', (cls._key(key),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        sha256, size, created = row
+        file_path = cls._blob_path(sha256)
+        if not os.path.exists(file_path):
+            with connection:
+                connection.execute('DELETE FROM documents WHERE key = ?', (cls._key(key),))
+            return None
+
+        with connection:
+            connection.execute(
+                'UPDATE documents SET last_access = ? WHERE key = ?', (time.time(), cls._key(key))
+            )
+        return {'path': file_path, 'sha256': sha256, 'size': size, 'created': created}
+
+    @classmethod
+    def store_stream(cls, key, chunks):
+        """Passes the chunks through while writing them into the cache.
+        The document is added only if the stream was consumed completely
+        """
+        os.makedirs(DOCUMENT_CACHE_DIR, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        file_descriptor, temp_path = tempfile.mkstemp(dir=DOCUMENT_CACHE_DIR, suffix='.part')
+        completed = False
+        try:
+            with os.fdopen(file_descriptor, 'wb') as temp_file:
+                for chunk in chunks:
+                    temp_file.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                    yield chunk
+            completed = True
+        finally:
+            if completed:
+                sha256 = digest.hexdigest()
+                os.replace(temp_path, cls._blob_path(sha256))
+                cls._add(key, sha256, size)
+            else:
+                os.remove(temp_path)
+
+    @classmethod
+    def reset(cls):
+        """Drops the connection of the current thread, e.g. after the process was forked"""
+        connection = getattr(cls._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+        cls._local = threading.local()
+
+    @classmethod
+    def _add(cls, key, sha256, size):
+        now = time.time()
+        connection = cls._connection()
+        with connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO documents (key, sha256, size, created, last_access) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (cls._key(key), sha256, size, now, now)
+            )
+        cls._evict(connection)
+
+    @classmethod
+    def _evict(cls, connection):
+        """Removes the least recently used files until the cache fits its size limit"""
+        blobs = connection.execute(
+            'SELECT sha256, MAX(size), MAX(last_access) FROM documents '
+            'GROUP BY sha256 ORDER BY MAX(last_access)'
+        ).fetchall()
+        total = sum(size for _, size, _ in blobs)
+
+        for sha256, size, _ in blobs:
+            if total <= DOCUMENT_CACHE_MAX_BYTES:
+                break
+            with connection:
+                connection.execute('DELETE FROM documents WHERE sha256 = ?', (sha256,))
+            try:
+                os.remove(cls._blob_path(sha256))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    @staticmethod
+    def _key(key):
+        return '/'.join(str(part) for part in key)
+
+    @staticmethod
+    def _blob_path(sha256):
+        return os.path.join(DOCUMENT_CACHE_DIR, f'{sha256}.pdf')
+
+    @classmethod
+    def _connection(cls):
+        connection = getattr(cls._local, 'connection', None)
+        if connection is None:
+            os.makedirs(DOCUMENT_CACHE_DIR, exist_ok=True)
+            connection = sqlite3.connect(os.path.join(DOCUMENT_CACHE_DIR, 'index.db'), timeout=10)
+            connection.execute('PRAGMA journal_mode=WAL')
+            with connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS documents ('
+                    'key TEXT PRIMARY KEY, sha256 TEXT NOT NULL, size INTEGER NOT NULL, '
+                    'created REAL NOT NULL, last_access REAL NOT NULL)'
+                )
+            cls._local.connection = connection
+        return connection
@@ -1,14 +1,17 @@
 import os
 import uuid
 
-from docusign_esign import ApiClient, AccountsApi
-
+from app import sdk
 from app.ds_config import (
     TOKEN_EXPIRATION_IN_SECONDS,
     CODE_GRANT_SCOPES,
     DS_RETURN_URL,
     DS_DEMO_SERVER
 )
+from app.client_pool import ClientPool
+from app.metrics import Metrics
+from app.scheduler import OutboundScheduler
+from app.token_manager import TokenManager
 
 
 class DsClient:
@@ -17,11 +20,13 @@ class DsClient:
     """
 
     @staticmethod
-    def get_instance():
+    def get_instance(host=None, access_token=None):
         """
-        Getting a client instance with DS_HOST_NAME set
+        Getting a pooled client instance with DS_HOST_NAME set
         """
-        client = ApiClient()
+        if host is None:
+            host = os.environ.get('DS_AUTH_SERVER')
+        client = ClientPool.get_client(host, access_token)
         host_name = os.environ.get('DS_AUTH_SERVER').split('://')[1]
         client.set_oauth_host_name(oauth_host_name=host_name)
         return client
@@ -30,14 +35,7 @@ class DsClient:
     def get_configured_instance(cls, access_token, host=None):
         if host is None:
             host = DS_DEMO_SERVER + '/restapi'
-        client = cls.get_instance()
-        client.host = host
-        client.set_default_header(
-            header_name="Authorization",
-            header_value=f"Bearer {access_token}"
-        )
-
-        return client
+        return cls.get_instance(host, access_token)
 
     @classmethod
     def get_redirect_uri(cls):
@@ -58,6 +56,8 @@ class DsClient:
         return uri
 
     @classmethod
+    @Metrics.track_call('oauth_callback')
+    @OutboundScheduler.priority('high')
     def callback(cls, code):
         """
         Callback method for obtaining access token on Oauth autirization
@@ -69,15 +69,14 @@ class DsClient:
             code=code
         )
 
-        client.set_default_header(
-            header_name="Authorization",
-            header_value=f"Bearer {response.access_token}"
+        account_info = cls._get_account_info(
+            cls.get_instance(access_token=response.access_token) # pylint: disable=no-member
         )
-        account_info = cls._get_account_info(client)
 
         auth_data = {
             'access_token': response.access_token, # pylint: disable=no-member
             'account_id': account_info['account_id'],
+            'user_id': account_info['user_id'],
             'expires_in': int(response.expires_in), # pylint: disable=no-member
             'auth_type': 'code_grant'
         }
@@ -85,6 +84,7 @@ class DsClient:
         return auth_data
 
     @staticmethod
+    @Metrics.track_call('oauth_userinfo')
     def _get_account_info(client):
         client.host = os.environ.get('DS_AUTH_SERVER')
         response = client.call_api(
@@ -95,41 +95,42 @@ class DsClient:
             raise Exception(f'Cannot get user info: {response[1]}')
 
         accounts = response[0]['accounts']
+        user_id = response[0].get('sub')
         target = os.environ.get('DS_TARGET_ACCOUNT_ID')
 
         # Look for specific account
         if target is not None and target != 'FALSE':
             for acc in accounts:
                 if acc['account_id'] == target:
-                    return acc
+                    return dict(acc, user_id=user_id)
 
             raise Exception(f'\n\nUser does not have access to account {target}\n\n')
 
         # Look for default
         for acc in accounts:
             if acc['is_default']:
-                return acc
+                return dict(acc, user_id=user_id)
 
         raise Exception('\n\nNo Appropriate account is found\n\n')
 
     @classmethod
+    @Metrics.track_call('oauth_jwt_token')
+    @OutboundScheduler.priority('high')
     def update_token(cls):
         """
         JWT authorization
         """
         client = cls.get_instance()
-        with open(os.environ.get('DS_PRIVATE_KEY'), 'r') as key_file:
-             private_key_content = key_file.read()
-        client.host = os.environ.get('DS_AUTH_SERVER')
+        private_key = TokenManager.get_private_key(os.environ.get('DS_PRIVATE_KEY'))
         host_name = os.environ.get('DS_AUTH_SERVER').split('://')[1]
         oauth_token = client.request_jwt_user_token(os.environ.get('DS_CLIENT_ID'),
                                       os.environ.get('DS_IMPERSONATED_USER_GUID'),
                                       host_name,
-                                      private_key_content,
+                                      private_key,
                                       TOKEN_EXPIRATION_IN_SECONDS,
                                       CODE_GRANT_SCOPES)
 
-        account_info = cls._get_account_info(client)
+        account_info = cls._get_account_info(cls.get_instance(access_token=oauth_token.access_token))
 
         auth_data = {
             'access_token': oauth_token.access_token,
@@ -141,7 +142,14 @@ class DsClient:
         return auth_data
 
     @classmethod
+    @Metrics.track_call('check_payment_gateway')
     def check_payment_gateway(cls, client_args):
+        """
+        Requests the payment gateways of the account, PaymentGatewayCache
+        keeps the result per account
+        Returns:
+            payment data of the app, empty when no gateway is enabled
+        """
         access_token = client_args.get('access_token')
         account_id = client_args.get('account_id')
 
@@ -149,7 +157,7 @@ class DsClient:
 
         client = cls.get_configured_instance(access_token)
 
-        account_api = AccountsApi(api_client=client)
+        account_api = sdk.AccountsApi(api_client=client)
 
         response = account_api.get_all_payment_gateway_accounts(account_id=account_id)
         if response.payment_gateway_accounts:
@@ -161,6 +169,5 @@ class DsClient:
                      'payment_gateway': os.environ.get('DS_PAYMENT_GATEWAY_NAME'),
                      'payment_gateway_account_id': os.environ.get('DS_PAYMENT_GATEWAY_ID')
                 }
-                cls.payment_gateway = payment_gateways[0]
 
         return payment_data
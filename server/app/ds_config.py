@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 TPL_PATH = os.path.abspath(
     os.path.join(os.path.dirname(os.path.realpath(__file__)), 'templates/')
@@ -6,18 +7,118 @@ TPL_PATH = os.path.abspath(
 IMG_PATH = os.path.abspath(
     os.path.join(os.path.dirname(os.path.realpath(__file__)), "images/")
 )
+# Documents are sent minified, and with the logo linked instead of embedded when it is hosted
+MINIFY_DOCUMENTS = os.environ.get('DS_MINIFY_DOCUMENTS', 'true').lower() == 'true'
+LOGO_URL = os.environ.get('DS_LOGO_URL')
+# Claim and policy envelopes are created from server templates registered once per document version
+SERVER_TEMPLATES = os.environ.get('DS_SERVER_TEMPLATES', 'false').lower() == 'true'
 
 TOKEN_EXPIRATION_IN_SECONDS = 3600
 TOKEN_REPLACEMENT_IN_SECONDS = 10 * 60
+TOKEN_REFRESH_MARGIN_IN_SECONDS = 60
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+# Per logger levels and sampling rates of records below WARNING, e.g. "app.api.auth=DEBUG,werkzeug=WARNING"
+LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+LOG_SAMPLING = os.environ.get('LOG_SAMPLING', '')
+# Records are dropped instead of blocking the request when the queue is full
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+CLIENT_POOL_MAXSIZE = int(os.environ.get('DS_CLIENT_POOL_MAXSIZE', 10))
+CLIENT_POOL_KEEPALIVE_IN_SECONDS = int(os.environ.get('DS_CLIENT_POOL_KEEPALIVE_IN_SECONDS', 60))
+CLIENT_POOL_IDLE_TIMEOUT_IN_SECONDS = int(os.environ.get('DS_CLIENT_POOL_IDLE_TIMEOUT_IN_SECONDS', 5 * 60))
+# Socket timeouts of the SDK clients, a hung host would hold the worker thread otherwise
+CLIENT_POOL_CONNECT_TIMEOUT_IN_SECONDS = float(os.environ.get('DS_CLIENT_POOL_CONNECT_TIMEOUT_IN_SECONDS', 5))
+CLIENT_POOL_READ_TIMEOUT_IN_SECONDS = float(os.environ.get('DS_CLIENT_POOL_READ_TIMEOUT_IN_SECONDS', 60))
+
+# Outbound transport: live, record (to the cassette) or replay (from the cassette)
+TRANSPORT_MODE = os.environ.get('DS_TRANSPORT_MODE', 'live')
+TRANSPORT_CASSETTE_PATH = os.environ.get(
+    'DS_TRANSPORT_CASSETTE', os.path.join(tempfile.gettempdir(), 'insurance_cassette.jsonl')
+)
+# Replayed responses take the recorded time unless a fixed latency is set
+TRANSPORT_REPLAY_LATENCY_MS = (
+    float(os.environ['DS_REPLAY_LATENCY_MS']) if os.environ.get('DS_REPLAY_LATENCY_MS') else None
+)
+TRANSPORT_REPLAY_JITTER_MS = float(os.environ.get('DS_REPLAY_JITTER_MS', 0))
+TRANSPORT_REPLAY_ERROR_RATE = float(os.environ.get('DS_REPLAY_ERROR_RATE', 0))
+TRANSPORT_REPLAY_ERROR_STATUS = int(os.environ.get('DS_REPLAY_ERROR_STATUS', 503))
+# eSignature API request bodies of at least this size are sent gzip encoded, 0 disables it
+TRANSPORT_COMPRESS_MIN_BYTES = int(os.environ.get('DS_COMPRESS_REQUESTS_MIN_BYTES', 8 * 1024))
+# App responses of at least this size are compressed when the client accepts gzip or deflate, 0 disables it
+RESPONSE_COMPRESS_MIN_BYTES = int(os.environ.get('DS_COMPRESS_RESPONSES_MIN_BYTES', 1024))
+
+# Outbound scheduler: share of the hourly API quota kept for calls of a higher priority,
+# e.g. "normal=0.1,low=0.25" lets history polling wait once less than 25% is left
+SCHEDULER_RESERVE = {
+    name.strip(): float(share)
+    for name, share in (
+        item.split('=', 1) for item in os.environ.get('DS_SCHEDULER_RESERVE', 'normal=0.1,low=0.25').split(',')
+        if '=' in item
+    )
+}
+# Longest time a call waits for quota and retries before the error is returned
+SCHEDULER_MAX_WAIT_IN_SECONDS = float(os.environ.get('DS_SCHEDULER_MAX_WAIT_IN_SECONDS', 10))
+SCHEDULER_MAX_RETRIES = int(os.environ.get('DS_SCHEDULER_MAX_RETRIES', 3))
+SCHEDULER_BACKOFF_BASE_IN_SECONDS = 0.2
+SCHEDULER_BACKOFF_MAX_IN_SECONDS = 5
+
+# Circuit breaker of every Docusign host: the circuit opens when at least BREAKER_ERROR_RATE
+# of the calls of the window failed (connection errors and 5xx) or BREAKER_SLOW_RATE were slow
+BREAKER_WINDOW_IN_SECONDS = float(os.environ.get('DS_BREAKER_WINDOW_IN_SECONDS', 30))
+BREAKER_MIN_CALLS = int(os.environ.get('DS_BREAKER_MIN_CALLS', 10))
+BREAKER_ERROR_RATE = float(os.environ.get('DS_BREAKER_ERROR_RATE', 0.5))
+BREAKER_SLOW_CALL_IN_SECONDS = float(os.environ.get('DS_BREAKER_SLOW_CALL_IN_SECONDS', 10))
+BREAKER_SLOW_RATE = float(os.environ.get('DS_BREAKER_SLOW_RATE', 0.8))
+# Time the circuit stays open before probe calls are let through
+BREAKER_OPEN_IN_SECONDS = float(os.environ.get('DS_BREAKER_OPEN_IN_SECONDS', 30))
+BREAKER_HALF_OPEN_PROBES = int(os.environ.get('DS_BREAKER_HALF_OPEN_PROBES', 2))
+
+# Worker threads shared by all claim batches and the largest accepted batch
+BATCH_MAX_WORKERS = int(os.environ.get('DS_BATCH_MAX_WORKERS', 8))
+BATCH_MAX_CLAIMS = int(os.environ.get('DS_BATCH_MAX_CLAIMS', 500))
+
+# Recipients per bulk send list, Docusign accepts at most 1000
+BULK_SEND_LIST_SIZE = min(int(os.environ.get('DS_BULK_SEND_LIST_SIZE', 1000)), 1000)
+BULK_SEND_MAX_REJECTED_ROWS = 100
+BULK_BATCHES_IN_SESSION = 50
+
+HISTORY_PAGE_SIZE = 100
+HISTORY_ENVELOPE_IDS_PER_REQUEST = 50
+HISTORY_CURSOR_MAX_USERS = 10000
+HISTORY_CURSOR_OVERLAP_IN_SECONDS = 60
+# Envelopes created earlier than this are no longer listed in the user's history
+HISTORY_RETENTION_IN_DAYS = int(os.environ.get('DS_HISTORY_RETENTION_IN_DAYS', 365))
+ENVELOPE_REGISTRY_PATH = os.environ.get(
+    'DS_ENVELOPE_REGISTRY_PATH', os.path.join(tempfile.gettempdir(), 'insurance_envelopes.db')
+)
+
+STATUS_STORE_PATH = os.environ.get(
+    'DS_STATUS_STORE_PATH', os.path.join(tempfile.gettempdir(), 'insurance_status.db')
+)
+# Keys of the Connect configuration used to sign the webhook payloads
+CONNECT_HMAC_KEYS = [key for key in os.environ.get('DS_CONNECT_HMAC_KEYS', '').split(',') if key]
+
+DOCUMENT_CACHE_DIR = os.environ.get(
+    'DS_DOCUMENT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'insurance_documents')
+)
+DOCUMENT_CACHE_MAX_BYTES = int(os.environ.get('DS_DOCUMENT_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+DOCUMENT_CHUNK_SIZE = 64 * 1024
 
 CLICKWRAP_BASE_HOST = 'https://demo.docusign.net'
 CLICKWRAP_BASE_URI = '/clickapi/v1/accounts'
 CLICKWRAP_TIME_DELTA_IN_MINUTES = 15
+CLICKWRAP_REGISTRY_PATH = os.environ.get(
+    'DS_CLICKWRAP_REGISTRY_PATH', os.path.join(tempfile.gettempdir(), 'insurance_clickwraps.json')
+)
 
 CONNECTED_FIELDS_BASE_HOST = 'https://api-d.docusign.com'
 TWILIO_EXTENSION_ID = "6ff9ae39-ad45-4d04-b0c2-a6e2214f5925"
 EMAILABLE_EXTENSION_ID = "5e3b623f-afaf-45da-b6a0-f5abc3c32128"
 SMARTY_EXTENSION_ID = "04bfc1ae-1ba0-42d0-8c02-264417a7b234"
+EXTENSIONS_CACHE_TTL_IN_SECONDS = 5 * 60
+EXTENSIONS_REQUEST_TIMEOUT_IN_SECONDS = 10
+PAYMENT_GATEWAY_CACHE_TTL_IN_SECONDS = int(os.environ.get('DS_PAYMENT_GATEWAY_CACHE_TTL_IN_SECONDS', 10 * 60))
 
 CODE_GRANT_SCOPES =  ['signature', 'impersonation', 'click.manage', 'adm_store_unified_repo_read']
 PERMISSION_SCOPES = ['signature', 'impersonation', 'click.manage', 'adm_store_unified_repo_read']
@@ -1,17 +1,28 @@
-import os
-
-from docusign_esign import EnvelopesApi, RecipientViewRequest
-from flask import send_file
+from flask import Response, send_file, stream_with_context
 
+from app import sdk
 from app.ds_client import DsClient
+from app.document_cache import DocumentCache
+from app.ds_config import (
+    HISTORY_PAGE_SIZE, HISTORY_ENVELOPE_IDS_PER_REQUEST, DOCUMENT_CHUNK_SIZE, SERVER_TEMPLATES
+)
+from app.envelope_history import EnvelopeHistory
+from app.http_cache import HttpCache
+from app.metrics import Metrics
+from app.scheduler import OutboundScheduler
+from app.server_templates import ServerTemplates
+from app.status_store import EnvelopeStatusStore
 
 
 class Envelope:
     @staticmethod
+    @Metrics.track_call('envelope_send')
+    @OutboundScheduler.priority('high')
     def send(envelope, session):
         """Send an envelope
         Parameters:
-            envelope (object): EnvelopeDefinition object
+            envelope (dict): Envelope definition JSON payload
+                built by DsDocument (an EnvelopeDefinition object is accepted too)
         Returns:
             envelope_id (str): envelope ID
         """
@@ -22,14 +33,24 @@ class Envelope:
 
         ds_client = DsClient.get_configured_instance(access_token)
 
-        envelope_api = EnvelopesApi(ds_client)
+        envelope_definition = envelope
+        if SERVER_TEMPLATES and isinstance(envelope, dict):
+            # Only the recipient and the tab values are sent, the document is in the template
+            envelope_definition = ServerTemplates.template_envelope(envelope, session)
+
+        envelope_api = sdk.EnvelopesApi(ds_client)
         results = envelope_api.create_envelope(
             account_id,
-            envelope_definition=envelope
+            envelope_definition=envelope_definition
         )
+
+        if isinstance(envelope, dict):
+            EnvelopeStatusStore.record_created(account_id, results.envelope_id, envelope)
         return results.envelope_id
 
     @staticmethod
+    @Metrics.track_call('envelope_get_view')
+    @OutboundScheduler.priority('high')
     def get_view(envelope_id, envelope_args, user, session, authentication_method='None'):
         """Get the recipient view
         Parameters:
@@ -44,7 +65,7 @@ class Envelope:
         account_id = session.get('account_id')
 
         # Create the recipient view request object
-        recipient_view_request = RecipientViewRequest(
+        recipient_view_request = sdk.RecipientViewRequest(
             authentication_method=authentication_method,
             client_user_id=envelope_args['signer_client_id'],
             recipient_id='1',
@@ -56,7 +77,7 @@ class Envelope:
         # Exceptions will be caught by the calling function
         ds_client = DsClient.get_configured_instance(access_token)
 
-        envelope_api = EnvelopesApi(ds_client)
+        envelope_api = sdk.EnvelopesApi(ds_client)
         results = envelope_api.create_recipient_view(
             account_id,
             envelope_id,
@@ -64,56 +85,166 @@ class Envelope:
         )
         return results
 
-    @staticmethod
-    def list(envelope_args, user_documents, session):
+    @classmethod
+    @Metrics.track_call('envelope_list')
+    @OutboundScheduler.priority('low')
+    def list(cls, envelope_args, user_documents, session):
         """Get status changes for one or more envelopes
         Parameters:
             envelope_args (dict): Document parameters
-            user_documents (list): Documents signed by user
+            user_documents (list): IDs of the envelopes registered for the user
         Returns:
-            EnvelopesInformation
+            list of envelope dicts, only changes since the previous
+            call are requested from Docusign
         """
         access_token = session.get('access_token')
         account_id = session.get('account_id')
 
-        if not access_token or not account_id:
+        if not access_token or not account_id or not user_documents:
             return []
 
-        ds_client = DsClient.get_configured_instance(access_token)
-        envelope_api = EnvelopesApi(ds_client)
-        envelopes_info = envelope_api.list_status_changes(
-            account_id,
-            from_date=envelope_args['from_date'],
-            include='recipients'
-        )
-        if not envelopes_info.envelopes:
-            return []
-        results = [env.to_dict() for env in envelopes_info.envelopes
-                   if env.envelope_id in user_documents]
-        return results
+        from_date = envelope_args['from_date']
+        envelope_ids = list(dict.fromkeys(user_documents))
+
+        # With Connect configured the local store is kept up to date by Docusign,
+        # only envelopes it doesn't know yet are polled
+        stored = {}
+        if EnvelopeStatusStore.is_connect_enabled():
+            stored = EnvelopeStatusStore.get_envelopes(account_id, envelope_ids)
+        missing_ids = [envelope_id for envelope_id in envelope_ids if envelope_id not in stored]
+
+        if missing_ids:
+            ds_client = DsClient.get_configured_instance(access_token)
+            envelope_api = sdk.EnvelopesApi(ds_client)
+
+            def fetch(ids, since):
+                return cls._list_status_changes(envelope_api, account_id, ids, since)
+
+            user_key = (account_id, getattr(session, 'sid', None))
+            polled = EnvelopeHistory.sync(user_key, missing_ids, from_date, fetch)
+            EnvelopeStatusStore.save_envelopes(account_id, polled)
+            stored.update((env['envelope_id'], env) for env in polled)
+
+        return [
+            stored[envelope_id] for envelope_id in envelope_ids
+            if envelope_id in stored and cls._changed_since(stored[envelope_id], from_date)
+        ]
+
+    @staticmethod
+    def history_etag(envelopes, from_date):
+        """Returns the entity tag of an envelope list, derived from the status
+        change times of the envelopes and their signers
+        """
+        return HttpCache.etag([from_date, [
+            (
+                env.get('envelope_id'),
+                env.get('status'),
+                env.get('status_changed_date_time'),
+                [
+                    (signer.get('recipient_id'), signer.get('status'), signer.get('status_changed_date_time'))
+                    for signer in (env.get('recipients') or {}).get('signers') or []
+                ]
+            )
+            for env in envelopes
+        ]])
+
+    @staticmethod
+    def _changed_since(envelope, from_date):
+        if not from_date:
+            return True
+        status_changed = envelope.get('status_changed_date_time') or ''
+        return status_changed[:19] >= from_date[:19]
 
     @staticmethod
-    def download(args, session):
-        """Download the specified document from the envelope"""
+    def _list_status_changes(envelope_api, account_id, envelope_ids, from_date):
+        """Requests the status changes of the given envelopes page by page
+        Returns:
+            tuple of the envelope dicts and the time the query was made at
+        """
+        queried_at = EnvelopeHistory.now()
+        results = []
+        for chunk_start in range(0, len(envelope_ids), HISTORY_ENVELOPE_IDS_PER_REQUEST):
+            chunk = envelope_ids[chunk_start:chunk_start + HISTORY_ENVELOPE_IDS_PER_REQUEST]
+            start_position = 0
+            while True:
+                envelopes_info = envelope_api.list_status_changes(
+                    account_id,
+                    envelope_ids=','.join(chunk),
+                    from_date=from_date,
+                    include='recipients',
+                    count=str(HISTORY_PAGE_SIZE),
+                    start_position=str(start_position)
+                )
+                if chunk_start == 0 and start_position == 0 and envelopes_info.last_queried_date_time:
+                    queried_at = envelopes_info.last_queried_date_time
+
+                page = envelopes_info.envelopes or []
+                results.extend(env.to_dict() for env in page)
+
+                start_position += len(page)
+                if not page or start_position >= int(envelopes_info.total_set_size or 0):
+                    break
+        return results, queried_at
+
+    @classmethod
+    @Metrics.track_call('envelope_download')
+    def download(cls, args, session):
+        """Download the specified document from the envelope.
+        Documents of completed envelopes are served from the local cache
+        with their hash as entity tag, other documents are streamed from
+        Docusign unless the envelope status did not change since the client got them
+        """
         access_token = session.get('access_token')
         account_id = session.get('account_id')
+        download_name = f"{args['envelope_id']}_{args['document_id']}.pdf"
+        cache_key = (account_id, args['envelope_id'], args['document_id'])
+
+        cached = DocumentCache.lookup(cache_key)
+        Metrics.count_cache('document', cached is not None)
+        if cached:
+            response = send_file(
+                cached['path'],
+                mimetype='application/pdf',
+                as_attachment=True,
+                download_name=download_name,
+                conditional=True,
+                etag=cached['sha256'],
+                last_modified=cached['created']
+            )
+            response.cache_control.private = True
+            return response
+
+        # The document only changes along with the status of the envelope or of its signers
+        version = EnvelopeStatusStore.get_version(account_id, args['envelope_id'])
+        etag = HttpCache.etag([cache_key, version]) if version else None
+        not_modified = HttpCache.not_modified(etag) if etag else None
+        if not_modified:
+            return not_modified
 
         ds_client = DsClient.get_configured_instance(access_token)
-        envelope_api = EnvelopesApi(ds_client)
-        file_path = envelope_api.get_document(
-            account_id, args['document_id'], args['envelope_id'], certificate=True
+        envelope_api = sdk.EnvelopesApi(ds_client)
+        response = envelope_api.get_document(
+            account_id, args['document_id'], args['envelope_id'], certificate=True,
+            _preload_content=False
         )
 
-        if isinstance(file_path, (bytes, bytearray)):
-            import tempfile
-            temp_dir = tempfile.gettempdir()
-            temp_filename = f"{args['envelope_id']}_{args['document_id']}.pdf"
-            abs_path = os.path.join(temp_dir, temp_filename)
-            with open(abs_path, "wb") as f:
-                f.write(file_path)
-            file_path = abs_path
-
-        (dirname, filename) = os.path.split(file_path)
-        file_path = os.path.abspath(file_path)
-
-        return send_file(file_path, as_attachment=True, download_name=os.path.basename(filename))
+        def stream():
+            try:
+                yield from response.stream(DOCUMENT_CHUNK_SIZE)
+            finally:
+                response.release_conn()
+
+        chunks = stream()
+        # Documents of completed envelopes never change
+        if EnvelopeStatusStore.get_status(account_id, args['envelope_id']) == 'completed':
+            chunks = DocumentCache.store_stream(cache_key, chunks)
+
+        headers = {'Content-Disposition': f'attachment; filename="{download_name}"'}
+        if response.headers.get('Content-Length'):
+            headers['Content-Length'] = response.headers['Content-Length']
+        streamed = Response(
+            stream_with_context(chunks),
+            mimetype=response.headers.get('Content-Type', 'application/pdf'),
+            headers=headers
+        )
+        return HttpCache.tag(streamed, etag) if etag else streamed
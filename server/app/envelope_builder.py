@@ -0,0 +1,384 @@
+import base64
+from functools import lru_cache
+
+from app.extensions import Extensions
+
+# Lines of the prefill tabs of long texts, the layout must not depend on the values
+PREFILL_LINES = {'description': 20}
+PREFILL_LINE_HEIGHT = 16
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict of the shared tab layouts. It is still a dict, so it is
+    serialized like the rest of the payload, but any mutation raises TypeError
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('Shared tab layouts are read-only, copy them with dict() first')
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def freeze(value):
+    """Returns the value with its dicts made read-only and its lists made tuples"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class EnvelopeBuilder:
+    """
+    Builds envelope definitions directly as JSON payloads for the
+    eSignature REST API, without going through the docusign_esign models.
+    Static tab layouts are built once and shared between payloads,
+    they are frozen so that a mutation fails instead of leaking into other envelopes
+    """
+
+    CLAIM_SIGN_HERE_TAB = freeze({
+        'anchorString': '/signature_1/',
+        'anchorUnits': 'pixels',
+        'anchorYOffset': '10',
+        'anchorXOffset': '20'
+    })
+
+    CLAIM_ATTACHMENT_TAB = freeze({
+        'anchorString': '/attachment/',
+        'anchorYOffset': '-20',
+        'anchorUnits': 'pixels',
+        'anchorXOffset': '20',
+        'optional': 'true'
+    })
+
+    INSURANCE_SIGN_HERE_TAB = freeze({
+        'anchorString': '/sn1/',
+        'anchorYOffset': '10',
+        'anchorUnits': 'pixels',
+        'anchorXOffset': '20'
+    })
+
+    # Number tabs for the coverage amount and deductible
+    PAYMENT_NUMBER_TABS = freeze((
+        {
+            'font': 'helvetica',
+            'fontSize': 'size11',
+            'anchorString': '/l1e/',
+            'anchorYOffset': '-7',
+            'anchorUnits': 'pixels',
+            'tabLabel': 'l1e',
+            'required': 'true'
+        },
+        {
+            'font': 'helvetica',
+            'fontSize': 'size11',
+            'anchorString': '/l2e/',
+            'anchorYOffset': '-7',
+            'anchorUnits': 'pixels',
+            'tabLabel': 'l2e',
+            'required': 'true'
+        },
+    ))
+
+    # Checkbox that applies the discount
+    PAYMENT_CHECKBOX_TABS = freeze((
+        {
+            'font': 'helvetica',
+            'fontSize': 'size11',
+            'anchorString': '/cb/',
+            'anchorYOffset': '-4',
+            'anchorUnits': 'pixels',
+            'anchorXOffset': '-8',
+            'tabLabel': 'checkbox',
+            'height': '50',
+            'bold': 'true'
+        },
+    ))
+
+    # Locked text tabs of the renewal notice, their values are set per recipient of the bulk send list
+    RENEWAL_TEXT_TABS = freeze(tuple(
+        {
+            'documentId': '1',
+            'pageNumber': '1',
+            'anchorString': f'/{label}/',
+            'anchorUnits': 'pixels',
+            'anchorYOffset': '-5',
+            'tabLabel': label,
+            'locked': 'true'
+        }
+        for label in ('policy_number', 'renewal_date', 'premium')
+    ))
+
+    # Bulk send lists replace the placeholder signer with their recipients
+    BULK_SIGNER_ROLE = 'signer'
+
+    @staticmethod
+    def encode_document(rendered_html):
+        """Returns the base64 representation of the rendered HTML document"""
+        return base64.b64encode(rendered_html.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def document(base64_file_content, name, document_id):
+        return {
+            'documentBase64': base64_file_content,
+            'name': name,
+            'fileExtension': 'html',
+            'documentId': document_id
+        }
+
+    @staticmethod
+    def signer(user, envelope_args, tabs):
+        """Creates the embedded signer recipient"""
+        return {
+            'email': user['email'],
+            'name': f"{user['first_name']} {user['last_name']}",
+            'recipientId': '1',
+            'routingOrder': '1',
+            # Setting the clientUserId marks the signer as embedded
+            'clientUserId': envelope_args['signer_client_id'],
+            'tabs': tabs
+        }
+
+    @classmethod
+    def bulk_signer(cls, tabs):
+        """Creates the placeholder signer of a bulk send envelope"""
+        return {
+            'name': f'Multi Bulk Recipient::{cls.BULK_SIGNER_ROLE}',
+            'email': f'MultiBulkRecipients-{cls.BULK_SIGNER_ROLE}@docusign.com',
+            'roleName': cls.BULK_SIGNER_ROLE,
+            'recipientId': '1',
+            'routingOrder': '1',
+            'tabs': tabs
+        }
+
+    @classmethod
+    def bulk_copy(cls, recipient, tab_values):
+        """Creates the bulk send list entry of one recipient
+        Parameters:
+            recipient (dict): first_name, last_name and email of the recipient
+            tab_values (dict): Values of the tabs by tab label
+        """
+        return {
+            'recipients': [{
+                'roleName': cls.BULK_SIGNER_ROLE,
+                'name': f"{recipient['first_name']} {recipient['last_name']}",
+                'email': recipient['email'],
+                'tabs': [
+                    {'tabLabel': label, 'initialValue': value} for label, value in tab_values.items()
+                ]
+            }]
+        }
+
+    @staticmethod
+    def mailing_list_field(list_id):
+        """Custom field linking a bulk send envelope to its bulk send list"""
+        return {
+            'textCustomFields': [{'name': 'mailingListId', 'required': 'false', 'show': 'false', 'value': list_id}]
+        }
+
+    @staticmethod
+    def envelope(email_subject, document, signer):
+        """Creates the top-level envelope definition"""
+        return {
+            'emailSubject': email_subject,
+            'documents': [document],
+            'recipients': {'signers': [signer]},
+            'status': 'sent'
+        }
+
+    @staticmethod
+    def template_role(role_name, signer, tabs):
+        """Creates the role of a server template filled by the signer
+        Parameters:
+            tabs (dict): Tab labels with their values, by tab type
+        """
+        role = {
+            'roleName': role_name,
+            'name': signer['name'],
+            'email': signer['email'],
+            'tabs': tabs
+        }
+        if signer.get('clientUserId'):
+            role['clientUserId'] = signer['clientUserId']
+        return role
+
+    @staticmethod
+    def template_envelope(template_id, role, status='sent'):
+        """Creates an envelope definition that only references a server template"""
+        return {
+            'templateId': template_id,
+            'templateRoles': [role],
+            'status': status
+        }
+
+    @staticmethod
+    def prefill_text_tabs(values):
+        """Creates the locked text tabs showing the values on their /name/ anchors
+        Parameters:
+            values (dict): Values by field name
+        """
+        tabs = []
+        for field, value in values.items():
+            value = str(value)
+            tab = {
+                'documentId': '1',
+                'pageNumber': '1',
+                'anchorString': f'/{field}/',
+                'anchorUnits': 'pixels',
+                'anchorYOffset': '-5',
+                'tabLabel': field,
+                'value': value,
+                'locked': 'true',
+                'width': '360'
+            }
+            if field in PREFILL_LINES:
+                # Long texts such as the claim description wrap over several lines
+                tab['height'] = str(PREFILL_LINES[field] * PREFILL_LINE_HEIGHT)
+            tabs.append(tab)
+        return tabs
+
+    @staticmethod
+    def split_tab_values(tabs):
+        """Separates the tab layout from the values of the recipient
+        Returns:
+            tuple of the tabs without values and the tab labels with their values
+        """
+        layout, values = {}, {}
+        for tab_type, type_tabs in tabs.items():
+            layout[tab_type] = []
+            for tab in type_tabs:
+                tab = dict(tab)
+                if 'value' in tab:
+                    tab.setdefault('tabLabel', tab.get('anchorString', '').strip('/'))
+                    values.setdefault(tab_type, []).append({'tabLabel': tab['tabLabel'], 'value': tab.pop('value')})
+                layout[tab_type].append(tab)
+        return layout, values
+
+    @staticmethod
+    def email_tab(anchor_string, value):
+        return {
+            'documentId': '1',
+            'pageNumber': '1',
+            'anchorString': anchor_string,
+            'anchorUnits': 'pixels',
+            'required': True,
+            'value': value,
+            'locked': False,
+            'anchorYOffset': '-5'
+        }
+
+    @classmethod
+    def extension_email_tab(cls, extensions, anchor_string, value):
+        """Creates the email tab verified by the first available email extension
+        Parameters:
+            extensions (ExtensionIndex): Extensions of the account
+        """
+        email = None
+        app_id = extensions.get_email_app_id()
+        for tab_fields in extensions.get_tabs(app_id, Extensions.EMAIL_TAB_LABEL):
+            email = dict(tab_fields, **cls.email_tab(anchor_string, value))
+        return email
+
+    @staticmethod
+    def extension_address_tabs(extensions, values):
+        """Creates the address text tabs verified by the address extension
+        Parameters:
+            extensions (ExtensionIndex): Extensions of the account
+        """
+        app_id = Extensions.getAddressExtensionId()
+
+        text_tabs = []
+        for field, label_pattern in Extensions.ADDRESS_TAB_LABELS.items():
+            for tab_fields in extensions.get_tabs(app_id, label_pattern):
+                text_tabs.append(dict(
+                    tab_fields,
+                    documentId='1',
+                    pageNumber='1',
+                    anchorString=f"/{field}/",
+                    anchorUnits='pixels',
+                    required=True,
+                    value=values[field],
+                    locked=False,
+                    anchorYOffset='-5',
+                    anchorXOffset='-5',
+                    width='50'
+                ))
+        return text_tabs
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def payment_formula_tabs(currency_multiplier, discount_percent, insurance_rate_percent,
+                             gateway_account_id, gateway_name):
+        """Creates the formula tabs calculating the total and the payment"""
+        trigger = {
+            'anchorString': '/trigger/',
+            'fontColor': 'white',
+            'anchorYOffset': '10',
+            'tabLabel': 'trigger',
+            'conditionalParentLabel': 'checkbox',
+            'conditionalParentValue': 'on',
+            'formula': '1',
+            'required': 'true',
+            'locked': 'true'
+        }
+
+        discount = {
+            'font': 'helvetica',
+            'fontSize': 'size11',
+            'bold': 'true',
+            'anchorString': '/dt/',
+            'anchorYOffset': '-4',
+            'anchorUnits': 'pixels',
+            'anchorXOffset': '0',
+            'tabLabel': 'discount',
+            'formula': f"if([trigger] > 0, {discount_percent}, 0)",
+            'roundDecimalPlaces': '0',
+            'locked': 'true'
+        }
+
+        # Formula tab for total price
+        total = f'([l1e]-[l2e]) * {insurance_rate_percent}/100'
+
+        formula_total = {
+            'font': 'helvetica',
+            'bold': 'true',
+            'fontSize': 'size12',
+            'anchorString': '/l4t/',
+            'anchorYOffset': '-6',
+            'anchorUnits': 'pixels',
+            'anchorXOffset': '84',
+            'tabLabel': 'l4t',
+            'formula': f'({total}) - (({total}) * [discount]/100)',
+            'roundDecimalPlaces': '2',
+            'required': 'true',
+            'locked': 'true'
+        }
+
+        # Payment line item and hidden formula
+        formula_payment = {
+            'tabLabel': 'payment',
+            'formula': f'([l4t]) * {currency_multiplier}',
+            'roundDecimalPlaces': '2',
+            'paymentDetails': {
+                'gatewayAccountId': gateway_account_id,
+                'currencyCode': 'USD',
+                'gatewayName': gateway_name,
+                'lineItems': [
+                    {'name': 'Insurance payment', 'description': '$[l4t]', 'amountReference': 'l4t'}
+                ]
+            },
+            'hidden': 'true',
+            'required': 'true',
+            'locked': 'true',
+            'documentId': '1',
+            'pageNumber': '1',
+            'xPosition': '0',
+            'yPosition': '0'
+        }
+
+        return freeze((formula_payment, formula_total, discount, trigger))
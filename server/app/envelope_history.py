@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from app.ds_config import HISTORY_CURSOR_MAX_USERS, HISTORY_CURSOR_OVERLAP_IN_SECONDS
+
+
+class EnvelopeHistory:
+    """
+    Per-user cursors for the envelope history.
+    A cursor remembers the envelopes returned for a from_date and the time
+    of the last sync, so the next request asks Docusign only for changes
+    """
+    _cursors = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def sync(cls, user_key, envelope_ids, from_date, fetch):
+        """Returns the envelopes of the user, fetching only what changed since the last sync
+        Parameters:
+            user_key (tuple): Key of the user the cursor belongs to
+            envelope_ids (list): Envelope IDs of the user
+            from_date (str): Date the history starts from
+            fetch (callable): fetch(envelope_ids, from_date) returning a tuple
+                of envelope dicts and the time the query was made at
+        Returns:
+            list of envelope dicts in the order of envelope_ids
+        """
+        with cls._lock:
+            cursor = cls._cursors.get(user_key)
+            if cursor is not None:
+                cls._cursors.move_to_end(user_key)
+
+        if cursor is None or cursor['from_date'] != from_date:
+            cursor = {'from_date': from_date, 'synced_at': None, 'ids': set(), 'envelopes': {}}
+
+        new_ids = [envelope_id for envelope_id in envelope_ids if envelope_id not in cursor['ids']]
+        known_ids = [envelope_id for envelope_id in envelope_ids if envelope_id in cursor['ids']]
+
+        envelopes = dict(cursor['envelopes'])
+        synced_at = cursor['synced_at']
+        if new_ids:
+            changed, synced_at = fetch(new_ids, from_date)
+            envelopes.update((env['envelope_id'], env) for env in changed)
+        if known_ids:
+            since = cls._with_overlap(cursor['synced_at'])
+            changed, queried_at = fetch(known_ids, since)
+            envelopes.update((env['envelope_id'], env) for env in changed)
+            synced_at = synced_at if new_ids else queried_at
+
+        cursor = {
+            'from_date': from_date,
+            'synced_at': synced_at,
+            'ids': cursor['ids'].union(envelope_ids),
+            'envelopes': envelopes
+        }
+        with cls._lock:
+            cls._cursors[user_key] = cursor
+            cls._cursors.move_to_end(user_key)
+            while len(cls._cursors) > HISTORY_CURSOR_MAX_USERS:
+                cls._cursors.popitem(last=False)
+
+        return [envelopes[envelope_id] for envelope_id in envelope_ids if envelope_id in envelopes]
+
+    @classmethod
+    def forget(cls, user_key):
+        with cls._lock:
+            cls._cursors.pop(user_key, None)
+
+    @staticmethod
+    def now():
+        return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+    @staticmethod
+    def _with_overlap(synced_at):
+        """Moves the cursor back a little to tolerate clock skew between us and Docusign"""
+        try:
+            synced = datetime.strptime(synced_at[:19], '%Y-%m-%dT%H:%M:%S')
+        except (TypeError, ValueError):
+            return synced_at
+        since = synced - timedelta(seconds=HISTORY_CURSOR_OVERLAP_IN_SECONDS)
+        return since.strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import threading
+import time
+
+from app.ds_config import ENVELOPE_REGISTRY_PATH
+
+
+class EnvelopeRegistry:
+    """
+    Server-side registry of the envelopes sent by each user.
+    Envelopes are keyed by user and account and indexed by envelope ID
+    and creation time, so membership checks are primary key lookups and
+    history queries are index range scans
+    """
+    _local = threading.local()
+
+    @classmethod
+    def add(cls, user_key, account_id, envelope_id, created=None):
+        with cls._connection() as connection:
+            connection.execute(
+                'INSERT OR IGNORE INTO user_envelopes (user_key, account_id, envelope_id, created) '
+                'VALUES (?, ?, ?, ?)',
+                (user_key, account_id, envelope_id, created or time.time())
+            )
+
+    @classmethod
+    def contains(cls, user_key, account_id, envelope_id):
+        if not user_key:
+            return False
+        row = cls._connection().execute(
+            'SELECT 1 FROM user_envelopes WHERE user_key = ? AND account_id = ? AND envelope_id = ?',
+            (user_key, account_id, envelope_id)
+        ).fetchone()
+        return row is not None
+
+    @classmethod
+    def list_ids(cls, user_key, account_id, created_from=None, created_to=None):
+        """Returns envelope IDs of the user ordered by creation time
+        Parameters:
+            created_from (float): Optional lower bound of the creation timestamp
+            created_to (float): Optional upper bound of the creation timestamp
+        """
+        if not user_key:
+            return []
+        rows = cls._connection().execute(
+            'SELECT envelope_id FROM user_envelopes '
+            'WHERE user_key = ? AND account_id = ? AND created >= ? AND created <= ? '
+            'ORDER BY created',
+            (
+                user_key,
+                account_id,
+                created_from if created_from is not None else float('-inf'),
+                created_to if created_to is not None else float('inf')
+            )
+        ).fetchall()
+        return [envelope_id for envelope_id, in rows]
+
+    @classmethod
+    def reset(cls):
+        """Drops the connection of the current thread, e.g. after the process was forked"""
+        cls._local = threading.local()
+
+    @classmethod
+    def _connection(cls):
+        connection = getattr(cls._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(ENVELOPE_REGISTRY_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(ENVELOPE_REGISTRY_PATH, timeout=10)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS user_envelopes ('
+                    'user_key TEXT NOT NULL, account_id TEXT NOT NULL, envelope_id TEXT NOT NULL, '
+                    'created REAL NOT NULL, PRIMARY KEY (user_key, account_id, envelope_id))'
+                )
+                connection.execute(
+                    'CREATE INDEX IF NOT EXISTS user_envelopes_created '
+                    'ON user_envelopes (user_key, account_id, created)'
+                )
+            cls._local.connection = connection
+        return connection
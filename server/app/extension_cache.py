@@ -0,0 +1,109 @@
+import threading
+import time
+
+from app.ds_config import CONNECTED_FIELDS_BASE_HOST, EXTENSIONS_CACHE_TTL_IN_SECONDS
+from app.extensions import Extensions
+from app.metrics import Metrics
+
+
+class ExtensionIndex:
+    """
+    Connected fields extensions of an account indexed by app ID and tab label pattern.
+    Tab fields that do not depend on the user are precomputed once
+    """
+
+    def __init__(self, extensions):
+        self.app_ids = [item["appId"] for item in extensions]
+        self._tabs = {}
+
+        for app in extensions:
+            app_id = app["appId"].strip()
+            for label_pattern in Extensions.TAB_LABEL_PATTERNS:
+                self._tabs[(app_id, label_pattern)] = [
+                    self._tab_fields(app["appId"], tab)
+                    for tab in app["tabs"] if label_pattern in tab["tabLabel"]
+                ]
+
+    def has_required_apps(self):
+        """Checks that the address extension and at least one email extension are installed"""
+        has_required_app = Extensions.getAddressExtensionId() in self.app_ids
+        has_at_least_one_optional = any(app_id in self.app_ids for app_id in Extensions.getEmailExtensionIds())
+        return has_required_app and has_at_least_one_optional
+
+    def get_tabs(self, app_id, label_pattern):
+        """Returns the precomputed tab fields of the app matching the label pattern"""
+        return self._tabs.get((app_id.strip(), label_pattern), [])
+
+    def get_email_app_id(self):
+        """Returns the first installed email extension"""
+        return next(
+            (app_id for app_id in self.app_ids if app_id.strip() in Extensions.getEmailExtensionIds()),
+            None
+        )
+
+    @staticmethod
+    def _tab_fields(app_id, tab):
+        verification_data = Extensions.extract_verification_data(app_id, tab)
+        return {
+            'name': verification_data["application_name"],
+            'tabLabel': verification_data["tab_label"],
+            'tooltip': verification_data["action_input_key"],
+            'extensionData': Extensions.get_extension_data(verification_data)
+        }
+
+
+class ExtensionCache:
+    """
+    Per account cache of the connected fields extensions.
+    Entries live for EXTENSIONS_CACHE_TTL_IN_SECONDS and are then
+    revalidated with a conditional request
+    """
+    _entries = {}
+    _refresh_locks = {}
+    _guard = threading.Lock()
+
+    @classmethod
+    def get(cls, account_id, access_token):
+        """Returns the ExtensionIndex of the account"""
+        entry = cls._entries.get(account_id)
+        is_fresh = entry is not None and entry['expires_at'] > time.monotonic()
+        Metrics.count_cache('extensions', is_fresh)
+        if is_fresh:
+            return entry['index']
+
+        with cls._get_refresh_lock(account_id):
+            entry = cls._entries.get(account_id)
+            if entry is None or entry['expires_at'] <= time.monotonic():
+                entry = cls._refresh(account_id, access_token, entry)
+        return entry['index']
+
+    @classmethod
+    def invalidate(cls, account_id=None):
+        with cls._guard:
+            if account_id is None:
+                cls._entries.clear()
+            else:
+                cls._entries.pop(account_id, None)
+
+    @classmethod
+    def _refresh(cls, account_id, access_token, entry):
+        etag = entry['etag'] if entry is not None else None
+        response = Extensions.fetch_extensions(
+            account_id, access_token, CONNECTED_FIELDS_BASE_HOST, etag=etag
+        )
+
+        if response['not_modified']:
+            entry = dict(entry)
+        else:
+            entry = {
+                'index': ExtensionIndex(response['data']),
+                'etag': response['etag']
+            }
+        entry['expires_at'] = time.monotonic() + EXTENSIONS_CACHE_TTL_IN_SECONDS
+        cls._entries[account_id] = entry
+        return entry
+
+    @classmethod
+    def _get_refresh_lock(cls, account_id):
+        with cls._guard:
+            return cls._refresh_locks.setdefault(account_id, threading.Lock())
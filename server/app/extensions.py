@@ -1,22 +1,64 @@
-import requests
-
-from app.ds_config import EMAILABLE_EXTENSION_ID, SMARTY_EXTENSION_ID, TWILIO_EXTENSION_ID 
+from app.ds_config import (
+    EMAILABLE_EXTENSION_ID,
+    SMARTY_EXTENSION_ID,
+    TWILIO_EXTENSION_ID,
+    EXTENSIONS_REQUEST_TIMEOUT_IN_SECONDS
+)
+from app import sdk
+from app.client_pool import ClientPool
+from app.metrics import Metrics
 
 
 class Extensions: # pylint: disable=too-few-public-methods
+    # Tab labels of the connected fields used in the documents
+    EMAIL_TAB_LABEL = "VerifyEmailInput"
+    ADDRESS_TAB_LABELS = {
+        "street": "VerifyPostalAddressInput[0].street1",
+        "city": "VerifyPostalAddressInput[0].locality",
+        "state": "VerifyPostalAddressInput[0].subdivision",
+        "country": "VerifyPostalAddressInput[0].countryOrRegion",
+        "zip_code": "VerifyPostalAddressInput[0].postalCode",
+    }
+    TAB_LABEL_PATTERNS = [EMAIL_TAB_LABEL, *ADDRESS_TAB_LABELS.values()]
+
     @staticmethod
     def getExtensions(account_id, access_token, base_path):
+        return Extensions.fetch_extensions(account_id, access_token, base_path)['data']
+
+    @staticmethod
+    @Metrics.track_call('get_extensions')
+    def fetch_extensions(account_id, access_token, base_path, etag=None):
+        """Requests the connected fields tab groups of the account
+        Parameters:
+            etag (str): ETag of the cached response for a conditional request
+        Returns:
+            dict with the response data, its ETag and the not_modified flag
+        """
         headers = {
             "Authorization": "Bearer " + access_token,
             "Accept": "application/json",
             "Content-Type": "application/json"
         }
+        if etag:
+            headers["If-None-Match"] = etag
         url = f"{base_path}/v1/accounts/{account_id}/connected-fields/tab-groups"
-        
-        response = requests.get(url, headers=headers)
-        response_data = response.json()
 
-        return response_data
+        session = ClientPool.get_session(base_path)
+        response = session.get(url, headers=headers, timeout=EXTENSIONS_REQUEST_TIMEOUT_IN_SECONDS)
+        if response.status_code == 304:
+            return {'data': None, 'etag': etag, 'not_modified': True}
+
+        if not response.ok:
+            # Raised like the errors of the SDK calls, so the status and Retry-After are passed on
+            error = sdk.ApiException(status=response.status_code, reason=response.reason)
+            error.body = response.content
+            error.headers = response.headers
+            raise error
+        return {
+            'data': response.json(),
+            'etag': response.headers.get("ETag"),
+            'not_modified': False
+        }
     
     @staticmethod
     def getAddressExtensionId():
@@ -0,0 +1,75 @@
+import gzip
+import hashlib
+import json
+import zlib
+
+from flask import Response, request
+
+from app.ds_config import RESPONSE_COMPRESS_MIN_BYTES
+
+# Encodings offered to the clients, in order of preference
+ENCODERS = {
+    'gzip': lambda data: gzip.compress(data, compresslevel=6),
+    'deflate': lambda data: zlib.compress(data, 6)
+}
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'image/svg+xml',
+    'text/css', 'text/csv', 'text/html', 'text/javascript', 'text/plain'
+}
+
+
+class HttpCache:
+    """
+    Conditional GET and compression of the app responses. Responses carry
+    the data of the logged in user, browsers may keep them but must
+    revalidate them with If-None-Match before they are used
+    """
+
+    @staticmethod
+    def etag(parts):
+        """Returns an entity tag derived from the JSON serializable parts"""
+        data = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+        return hashlib.sha256(data).hexdigest()[:32]
+
+    @classmethod
+    def not_modified(cls, etag):
+        """Returns a 304 response when the client has the current version, otherwise None"""
+        if not request.if_none_match.contains_weak(etag):
+            return None
+        return cls.tag(Response(status=304), etag)
+
+    @staticmethod
+    def tag(response, etag):
+        """Sets the entity tag of the response, weak since it does not depend on the encoding"""
+        response.set_etag(etag, weak=True)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    @staticmethod
+    def compress(response):
+        """Compresses the body with the best encoding accepted by the client
+        when it is at least RESPONSE_COMPRESS_MIN_BYTES long.
+        Streamed responses and files are sent as they are
+        """
+        if not RESPONSE_COMPRESS_MIN_BYTES or response.direct_passthrough or response.is_streamed \
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        # Caches must not serve a compressed body to clients that did not accept it
+        response.vary.add('Accept-Encoding')
+        if response.status_code < 200 or response.status_code in (204, 206, 304) \
+                or 'Content-Encoding' in response.headers:
+            return response
+
+        data = response.get_data()
+        encoding = request.accept_encodings.best_match(list(ENCODERS))
+        if len(data) < RESPONSE_COMPRESS_MIN_BYTES or encoding is None:
+            return response
+
+        response.set_data(ENCODERS[encoding](data))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # A strong tag identifies the uncompressed bytes
+            response.set_etag(etag, weak=True)
+        return response
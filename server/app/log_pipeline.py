@@ -0,0 +1,183 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from app.ds_config import LOG_LEVEL, LOG_LEVELS, LOG_SAMPLING, LOG_QUEUE_SIZE
+
+REDACTED = '[REDACTED]'
+_SECRET_PATTERNS = [
+    # Keys of dicts, JSON objects, form bodies and query strings
+    (re.compile(
+        r'''(?i)(\b(?:access_token|refresh_token|id_token|assertion|password|client_secret|secret)'''
+        r'''['"]?\s*[:=]\s*['"]?)[^'"\s,&}]+'''
+    ), r'\1' + REDACTED),
+    # Authorization codes of the OAuth callback query string
+    (re.compile(r'(?i)([?&]code=)[^&\s\'"]+'), r'\1' + REDACTED),
+    (re.compile(r'(?i)(\bbearer\s+)[\w\-.~+/]+=*'), r'\1' + REDACTED),
+    # JWTs anywhere in the text
+    (re.compile(r'\beyJ[\w-]+\.[\w-]+\.[\w-]+'), REDACTED),
+]
+
+
+def _parse_mapping(value, convert):
+    """Parses "name=value,other=value" settings"""
+    mapping = {}
+    for item in value.split(','):
+        if '=' in item:
+            name, setting = item.split('=', 1)
+            mapping[name.strip()] = convert(setting.strip())
+    return mapping
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single line JSON objects with secrets redacted"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': LogPipeline.redact(record.getMessage()),
+            'process': record.process,
+            'thread': record.threadName
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = LogPipeline.redact(record.exc_text)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a share of the records below WARNING of the configured loggers"""
+
+    def __init__(self, rates):
+        super().__init__()
+        # The most specific logger name wins
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for name, rate in self.rates:
+            if record.name == name or record.name.startswith(name + '.'):
+                return random.random() < rate
+        return True
+
+
+_TRACEBACK_FORMATTER = logging.Formatter()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Enqueues records without blocking, records are dropped while the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        """Merges the arguments into the message like QueueHandler.prepare,
+        but keeps the traceback apart so it is logged as its own field
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _TRACEBACK_FORMATTER.formatException(record.exc_info)
+        # The traceback objects are not kept alive by the queue
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def take_dropped(self):
+        with self._lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class _ReportingListener(QueueListener):
+    """Queue listener that reports the records dropped since its last report"""
+
+    def __init__(self, log_queue, handler, queue_handler):
+        super().__init__(log_queue, handler, respect_handler_level=True)
+        self.queue_handler = queue_handler
+
+    def handle(self, record):
+        super().handle(record)
+        dropped = self.queue_handler.take_dropped()
+        if dropped:
+            super().handle(logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0,
+                'Dropped %s log records, the log queue was full', (dropped,), None
+            ))
+
+
+class LogPipeline:
+    """
+    Logging of the app. Records are formatted as JSON lines and written
+    to stdout by a background thread. The request threads only put them
+    on a bounded queue and never wait for the output
+    """
+    _listener = None
+    _queue_handler = None
+
+    @classmethod
+    def configure(cls):
+        if cls._queue_handler is not None:
+            return
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        cls._queue_handler = DroppingQueueHandler(log_queue)
+        cls._queue_handler.addFilter(SamplingFilter(_parse_mapping(LOG_SAMPLING, float)))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(cls._queue_handler)
+        root.setLevel(LOG_LEVEL.upper())
+        for name, level in _parse_mapping(LOG_LEVELS, str.upper).items():
+            logging.getLogger(name).setLevel(level)
+
+        cls._start_listener()
+        atexit.register(cls.stop)
+
+    @classmethod
+    def reset(cls):
+        """Starts a new writer thread, threads do not survive when the process is forked"""
+        if cls._queue_handler is not None:
+            cls._queue_handler.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            cls._start_listener()
+
+    @classmethod
+    def stop(cls):
+        """Writes the queued records and stops the writer thread"""
+        if cls._listener is not None and cls._listener._thread is not None:  # pylint: disable=protected-access
+            cls._listener.stop()
+
+    @staticmethod
+    def redact(text):
+        for pattern, replacement in _SECRET_PATTERNS:
+            text = pattern.sub(replacement, text)
+        return text
+
+    @classmethod
+    def _start_listener(cls):
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        cls._listener = _ReportingListener(cls._queue_handler.queue, handler, cls._queue_handler)
+        cls._listener.start()
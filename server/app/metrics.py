@@ -0,0 +1,179 @@
+import contextvars
+import os
+import time
+from functools import wraps
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily
+
+# Outbound calls take from tens of milliseconds to several seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_DURATION = Histogram(
+    'insurance_request_duration_seconds', 'Duration of the handled HTTP requests',
+    ['route', 'method', 'status'], buckets=LATENCY_BUCKETS
+)
+CALL_DURATION = Histogram(
+    'insurance_docusign_call_duration_seconds', 'Duration of the outbound Docusign operations',
+    ['operation'], buckets=LATENCY_BUCKETS
+)
+CALL_ERRORS = Counter(
+    'insurance_docusign_call_errors_total', 'Failed outbound Docusign operations',
+    ['operation', 'error']
+)
+CALLS_IN_FLIGHT = Gauge(
+    'insurance_docusign_calls_in_flight', 'Outbound Docusign operations in progress',
+    ['operation'], multiprocess_mode='livesum'
+)
+STAGE_DURATION = Histogram(
+    'insurance_stage_duration_seconds', 'Duration of the local request stages',
+    ['stage'], buckets=LATENCY_BUCKETS
+)
+CALL_RETRIES = Counter(
+    'insurance_docusign_retries_total', 'Outbound requests sent again after a 429 or 503 response',
+    ['host', 'status']
+)
+CALLS_THROTTLED = Counter(
+    'insurance_docusign_throttled_total', 'Outbound requests not sent because the API quota ran low',
+    ['host', 'priority']
+)
+CIRCUIT_STATE = Gauge(
+    'insurance_circuit_state', 'Circuit breaker state of the Docusign hosts: 0 closed, 1 half-open, 2 open',
+    ['host'], multiprocess_mode='livemax'
+)
+REQUEST_BODY_BYTES = Histogram(
+    'insurance_docusign_request_body_bytes', 'Size of the outbound request bodies before and after encoding',
+    ['operation', 'size'], buckets=(1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+)
+CACHE_REQUESTS = Counter(
+    'insurance_cache_requests_total', 'Cache lookups by result', ['cache', 'result']
+)
+
+
+_operation = contextvars.ContextVar('docusign_operation', default='other')
+
+
+class _ScrapeRegistry:
+    """Collects the metrics of the source and adds the cache hit ratios computed from them"""
+
+    def __init__(self, source):
+        self.source = source
+
+    def collect(self):
+        lookups = {}
+        for metric in self.source.collect():
+            yield metric
+            if metric.name == 'insurance_cache_requests':
+                for sample in metric.samples:
+                    if sample.name.endswith('_total'):
+                        counts = lookups.setdefault(sample.labels['cache'], {'hit': 0, 'miss': 0})
+                        counts[sample.labels['result']] += sample.value
+
+        ratio = GaugeMetricFamily(
+            'insurance_cache_hit_ratio', 'Share of the cache lookups that were hits', labels=['cache']
+        )
+        for cache, counts in sorted(lookups.items()):
+            total = counts['hit'] + counts['miss']
+            ratio.add_metric([cache], counts['hit'] / total if total else 0)
+        yield ratio
+
+
+class Metrics:
+    """
+    Prometheus metrics of the app.
+    With PROMETHEUS_MULTIPROC_DIR set, as gunicorn.conf.py does, every worker
+    writes its samples to that directory and the scrape aggregates them
+    """
+
+    @staticmethod
+    def track_call(operation):
+        """Decorator measuring an outbound Docusign operation"""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                CALLS_IN_FLIGHT.labels(operation).inc()
+                token = _operation.set(operation)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                except Exception as exc:
+                    CALL_ERRORS.labels(operation, Metrics.error_label(exc)).inc()
+                    raise
+                finally:
+                    CALL_DURATION.labels(operation).observe(time.perf_counter() - start)
+                    _operation.reset(token)
+                    CALLS_IN_FLIGHT.labels(operation).dec()
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def track_stage(stage):
+        """Decorator measuring a local stage of the request, e.g. template rendering"""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    STAGE_DURATION.labels(stage).observe(time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def count_cache(cache, hit):
+        CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+    @staticmethod
+    def count_retry(host, status):
+        CALL_RETRIES.labels(host, str(status)).inc()
+
+    @staticmethod
+    def count_throttled(host, priority):
+        CALLS_THROTTLED.labels(host, priority).inc()
+
+    @staticmethod
+    def set_circuit_state(host, state):
+        CIRCUIT_STATE.labels(host).set(state)
+
+    @staticmethod
+    def observe_request_body(raw_bytes, wire_bytes):
+        """Records the size of a request body of the current operation as built and as sent"""
+        operation = _operation.get()
+        REQUEST_BODY_BYTES.labels(operation, 'raw').observe(raw_bytes)
+        REQUEST_BODY_BYTES.labels(operation, 'wire').observe(wire_bytes)
+
+    @staticmethod
+    def observe_request(route, method, status, duration):
+        REQUEST_DURATION.labels(route, method, str(status)).observe(duration)
+
+    @staticmethod
+    def error_label(exc):
+        """Docusign API errors are labeled with their HTTP status, other errors with their type"""
+        status = getattr(exc, 'status', None)
+        return str(status) if status else type(exc).__name__
+
+    @staticmethod
+    def render():
+        """Returns the exposition of all metrics and its content type"""
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            source = CollectorRegistry()
+            multiprocess.MultiProcessCollector(source)
+        else:
+            source = REGISTRY
+        return generate_latest(_ScrapeRegistry(source)), CONTENT_TYPE_LATEST
+
+    @staticmethod
+    def mark_process_dead(pid):
+        """Removes the live gauges of a stopped worker"""
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            multiprocess.mark_process_dead(pid)
@@ -0,0 +1,94 @@
+import logging
+import os
+import threading
+import time
+
+from app import sdk
+from app.circuit_breaker import CircuitOpenError
+from app.ds_client import DsClient
+from app.ds_config import PAYMENT_GATEWAY_CACHE_TTL_IN_SECONDS
+from app.metrics import Metrics
+from app.token_manager import TokenManager
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentGatewayCache:
+    """
+    Per account cache of the payment gateway check of the buy insurance page.
+    Entries live for PAYMENT_GATEWAY_CACHE_TTL_IN_SECONDS, they are filled at
+    startup for the JWT account and after every login, and can be invalidated
+    when the gateways of an account change
+    """
+    _entries = {}
+    _refresh_locks = {}
+    _guard = threading.Lock()
+
+    @classmethod
+    def get(cls, account_id, access_token):
+        """Returns the payment data of the account, empty without an enabled gateway
+        Returns:
+            dict with payment_display_name, payment_gateway and payment_gateway_account_id
+        """
+        entry = cls._entries.get(account_id)
+        is_fresh = entry is not None and entry['expires_at'] > time.monotonic()
+        Metrics.count_cache('payment_gateway', is_fresh)
+        if not is_fresh:
+            with cls._get_refresh_lock(account_id):
+                entry = cls._entries.get(account_id)
+                if entry is None or entry['expires_at'] <= time.monotonic():
+                    entry = cls._refresh(account_id, access_token)
+        return dict(entry['payment_data'])
+
+    @classmethod
+    def warm(cls, account_id, access_token, background=False):
+        """Fills the entry of the account ahead of its first lookup, failures are only logged
+        Parameters:
+            background (bool): Whether to fill it in a background thread
+        """
+        if background:
+            threading.Thread(
+                target=cls.warm, args=(account_id, access_token), name='payment-gateway-warmup', daemon=True
+            ).start()
+            return
+        try:
+            cls.get(account_id, access_token)
+        except (sdk.ApiException, CircuitOpenError) as exc:
+            logger.warning('Payment gateway warm-up failed with status %s', exc.status)
+
+    @classmethod
+    def warm_up(cls):
+        """Fills the entry of the JWT account at startup when JWT is configured"""
+        if not (os.environ.get('DS_PRIVATE_KEY') and os.environ.get('DS_IMPERSONATED_USER_GUID')):
+            return
+        try:
+            auth_data = TokenManager.get_auth_data()
+        except Exception as exc:  # pylint: disable=broad-except
+            # Startup goes on, the entry is filled by the first lookup instead
+            logger.warning('Payment gateway warm-up skipped, no JWT token: %s', type(exc).__name__)
+            return
+        cls.warm(auth_data['account_id'], auth_data['access_token'])
+
+    @classmethod
+    def invalidate(cls, account_id=None):
+        with cls._guard:
+            if account_id is None:
+                cls._entries.clear()
+            else:
+                cls._entries.pop(account_id, None)
+
+    @classmethod
+    def _refresh(cls, account_id, access_token):
+        entry = {
+            'payment_data': DsClient.check_payment_gateway(
+                {'access_token': access_token, 'account_id': account_id}
+            ),
+            'expires_at': time.monotonic() + PAYMENT_GATEWAY_CACHE_TTL_IN_SECONDS
+        }
+        cls._entries[account_id] = entry
+        return entry
+
+    @classmethod
+    def _get_refresh_lock(cls, account_id):
+        with cls._guard:
+            return cls._refresh_locks.setdefault(account_id, threading.Lock())
@@ -0,0 +1,224 @@
+import contextlib
+import contextvars
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from app.ds_config import (
+    SCHEDULER_RESERVE,
+    SCHEDULER_MAX_WAIT_IN_SECONDS,
+    SCHEDULER_MAX_RETRIES,
+    SCHEDULER_BACKOFF_BASE_IN_SECONDS,
+    SCHEDULER_BACKOFF_MAX_IN_SECONDS
+)
+from app.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+# Methods that can be sent again without creating anything twice
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+RETRY_STATUSES = {429, 503}
+# Docusign API quotas are hourly
+QUOTA_PERIOD_IN_SECONDS = 3600
+
+_priority = contextvars.ContextVar('outbound_priority', default='normal')
+
+
+class RateLimited(Exception):
+    """The call was not sent, the quota left is reserved for calls of a higher priority"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Rate limited, retry after {retry_after} seconds')
+        self.retry_after = retry_after
+
+
+class _TokenBucket:
+    """
+    Estimate of the API quota left on a host. It is refilled at the hourly
+    limit spread over the hour and corrected with the rate limit headers
+    of every response. Until a response reported the limit, nothing is throttled
+    """
+
+    def __init__(self):
+        self.limit = None
+        self.tokens = 0.0
+        self.reset_at = None
+        self.updated = time.monotonic()
+
+    def take(self, priority, now):
+        """Takes a token when more than the reserve of the priority is left
+        Returns:
+            0 when the token was taken, otherwise the seconds until it can be
+        """
+        if self.limit is None:
+            return 0
+        self._refill(now)
+        reserve = SCHEDULER_RESERVE.get(priority, 0) * self.limit
+        if priority == 'high' or self.tokens - 1 >= reserve:
+            self.tokens = max(0.0, self.tokens - 1)
+            return 0
+        wait = (reserve + 1 - self.tokens) / self._rate()
+        if self.reset_at is not None:
+            wait = min(wait, max(0.0, self.reset_at - time.time()))
+        return max(wait, 0.05)
+
+    def update(self, headers, now):
+        """Synchronizes the bucket with the X-RateLimit headers of a response"""
+        try:
+            limit = int(headers.get('X-RateLimit-Limit'))
+            remaining = int(headers.get('X-RateLimit-Remaining'))
+        except (TypeError, ValueError):
+            return
+        self.limit = max(limit, 1)
+        self.tokens = float(remaining)
+        self.updated = now
+        try:
+            self.reset_at = float(headers.get('X-RateLimit-Reset'))
+        except (TypeError, ValueError):
+            self.reset_at = None
+
+    def exhaust(self, retry_after, now):
+        """A 429 response means the quota is used up whatever the estimate says"""
+        self.tokens = 0.0
+        self.updated = now
+        if retry_after is not None:
+            self.reset_at = time.time() + retry_after
+
+    def state(self):
+        return {
+            'limit': self.limit,
+            'remaining': None if self.limit is None else int(self.tokens),
+            'reset_at': self.reset_at
+        }
+
+    def _rate(self):
+        return self.limit / QUOTA_PERIOD_IN_SECONDS
+
+    def _refill(self, now):
+        if self.reset_at is not None and time.time() >= self.reset_at:
+            # A new quota period started
+            self.tokens = float(self.limit)
+            self.reset_at = None
+        else:
+            self.tokens = min(float(self.limit), self.tokens + (now - self.updated) * self._rate())
+        self.updated = now
+
+
+class OutboundScheduler:
+    """
+    Schedules the outbound Docusign calls of the process, all of them go through the transport.
+    Calls are admitted by priority while the quota runs low: high (claim and policy
+    submissions) is always sent, normal and low wait until the quota left exceeds
+    their reserve. Idempotent calls answered with 429 or 503 are retried with jittered
+    exponential backoff, honoring Retry-After
+    """
+    PRIORITIES = ('high', 'normal', 'low')
+
+    _buckets = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def priority(level):
+        """Context manager and decorator setting the priority of the calls made inside it"""
+        if level not in OutboundScheduler.PRIORITIES:
+            raise ValueError(f'Unknown priority {level}')
+
+        @contextlib.contextmanager
+        def scope():
+            token = _priority.set(level)
+            try:
+                yield
+            finally:
+                _priority.reset(token)
+        return scope()
+
+    @classmethod
+    def send(cls, method, url, call, close):
+        """Sends a call through the scheduler
+        Parameters:
+            call (callable): Sends the request, returns the response status, its headers and the response
+            close (callable): Releases a response that is discarded for a retry
+        Returns:
+            the response of the last attempt
+        Raises:
+            RateLimited when the call could not be admitted within SCHEDULER_MAX_WAIT_IN_SECONDS
+        """
+        host = urlsplit(url).netloc
+        priority = _priority.get()
+        deadline = time.monotonic() + SCHEDULER_MAX_WAIT_IN_SECONDS
+        retries = SCHEDULER_MAX_RETRIES if method.upper() in IDEMPOTENT_METHODS else 0
+
+        attempt = 0
+        while True:
+            cls._admit(host, priority, deadline)
+            status, headers, response = call()
+            cls._observe(host, status, headers)
+            if status not in RETRY_STATUSES or attempt >= retries:
+                return response
+
+            delay = cls._backoff(attempt, cls._retry_after(headers))
+            if time.monotonic() + delay > deadline:
+                return response
+            attempt += 1
+            Metrics.count_retry(host, status)
+            logger.info('Retrying %s %s after status %s in %.2fs', method, urlsplit(url).path, status, delay)
+            close(response)
+            time.sleep(delay)
+
+    @classmethod
+    def state(cls):
+        """Returns the quota estimate of every host"""
+        with cls._lock:
+            return {host: bucket.state() for host, bucket in cls._buckets.items()}
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._buckets = {}
+
+    @classmethod
+    def _admit(cls, host, priority, deadline):
+        while True:
+            now = time.monotonic()
+            with cls._lock:
+                wait = cls._bucket(host).take(priority, now)
+            if not wait:
+                return
+            if now + wait > deadline:
+                Metrics.count_throttled(host, priority)
+                raise RateLimited(max(1, int(wait + 0.999)))
+            time.sleep(min(wait, deadline - now))
+
+    @classmethod
+    def _observe(cls, host, status, headers):
+        now = time.monotonic()
+        with cls._lock:
+            bucket = cls._bucket(host)
+            bucket.update(headers, now)
+            if status == 429:
+                bucket.exhaust(cls._retry_after(headers), now)
+
+    @classmethod
+    def _bucket(cls, host):
+        bucket = cls._buckets.get(host)
+        if bucket is None:
+            bucket = cls._buckets[host] = _TokenBucket()
+        return bucket
+
+    @staticmethod
+    def _retry_after(headers):
+        try:
+            return max(0.0, float(headers.get('Retry-After')))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _backoff(attempt, retry_after):
+        # Full jitter spreads the retries of concurrent calls
+        ceiling = min(SCHEDULER_BACKOFF_MAX_IN_SECONDS, SCHEDULER_BACKOFF_BASE_IN_SECONDS * 2 ** attempt)
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay += retry_after
+        return delay
@@ -0,0 +1,29 @@
+"""
+Lazy access to the Docusign eSignature SDK.
+
+Importing docusign_esign loads all of its API and model modules, which takes
+longer than the rest of the app start. Attributes of this module are resolved
+from docusign_esign on first use, so the SDK is loaded with the first request
+that needs it:
+
+    from app import sdk
+
+    try:
+        sdk.EnvelopesApi(client).create_envelope(...)
+    except sdk.ApiException as exc:
+        ...
+"""
+import importlib
+import threading
+
+_module = None
+_lock = threading.Lock()
+
+
+def __getattr__(name):
+    global _module  # pylint: disable=global-statement
+    if _module is None:
+        with _lock:
+            if _module is None:
+                _module = importlib.import_module('docusign_esign')
+    return getattr(_module, name)
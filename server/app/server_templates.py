@@ -0,0 +1,107 @@
+import hashlib
+import json
+import logging
+import threading
+
+from app import sdk
+from app.ds_client import DsClient
+from app.envelope_builder import EnvelopeBuilder
+from app.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTemplates:
+    """
+    Registers the documents and the tab layout of the envelopes as Docusign templates.
+    A template is named after the hash of its content, so it is uploaded once per
+    account and document version and found again after a restart. Envelopes are then
+    created from the template with only the recipient and the prefilled tab values
+    """
+    SIGNER_ROLE = 'signer'
+    HASH_LENGTH = 12
+
+    _template_ids = {}
+    _register_locks = {}
+    _guard = threading.Lock()
+
+    @classmethod
+    def template_envelope(cls, envelope, session):
+        """Replaces an envelope definition built by DsDocument with one referencing its template
+        Parameters:
+            envelope (dict): Envelope definition JSON payload with a single signer
+            session (dict): Access token and account ID
+        Returns:
+            Envelope definition JSON payload with the template ID, the signer role and the tab values
+        """
+        signer = envelope['recipients']['signers'][0]
+        layout, values = EnvelopeBuilder.split_tab_values(signer.get('tabs') or {})
+        definition = cls._definition(envelope, signer, layout)
+
+        template_id = cls._get_or_create(session, definition)
+        return EnvelopeBuilder.template_envelope(
+            template_id, EnvelopeBuilder.template_role(cls.SIGNER_ROLE, signer, values), envelope['status']
+        )
+
+    @classmethod
+    def reset(cls):
+        with cls._guard:
+            cls._template_ids = {}
+
+    @classmethod
+    def _definition(cls, envelope, signer, layout):
+        definition = {
+            'emailSubject': envelope['emailSubject'],
+            'documents': envelope['documents'],
+            'recipients': {
+                'signers': [{
+                    'roleName': cls.SIGNER_ROLE,
+                    'recipientId': signer['recipientId'],
+                    'routingOrder': signer['routingOrder'],
+                    'tabs': layout
+                }]
+            }
+        }
+        content_hash = hashlib.sha256(
+            json.dumps(definition, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        ).hexdigest()
+        definition['name'] = f"{envelope['emailSubject']} [{content_hash[:cls.HASH_LENGTH]}]"
+        return definition
+
+    @classmethod
+    def _get_or_create(cls, session, definition):
+        account_id = session.get('account_id')
+        key = (account_id, definition['name'])
+        template_id = cls._template_ids.get(key)
+        Metrics.count_cache('server_template', template_id is not None)
+        if template_id is None:
+            # Concurrent envelopes of a new document version register it only once,
+            # the registration of one account does not hold up the others
+            with cls._get_register_lock(key):
+                template_id = cls._template_ids.get(key)
+                if template_id is None:
+                    template_id = cls._register(session, definition)
+                    cls._template_ids[key] = template_id
+        return template_id
+
+    @classmethod
+    def _get_register_lock(cls, key):
+        with cls._guard:
+            return cls._register_locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    @Metrics.track_call('server_template_register')
+    def _register(session, definition):
+        """Finds the template of the definition, uploading it when the account does not have it yet"""
+        ds_client = DsClient.get_configured_instance(session.get('access_token'))
+        templates_api = sdk.TemplatesApi(ds_client)
+        account_id = session.get('account_id')
+
+        found = templates_api.list_templates(account_id, search_text=definition['name'])
+        for template in found.envelope_templates or []:
+            if template.name == definition['name']:
+                return template.template_id
+
+        created = templates_api.create_template(account_id, envelope_template=definition)
+        logger.info('Registered server template %s', definition['name'])
+        return created.template_id
@@ -0,0 +1,213 @@
+import hashlib
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from app.metrics import Metrics
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session whose data is kept on the server, the cookie holds only the signed session ID"""
+
+    def __init__(self, initial=None, sid=None, digest=None, expires=None):
+        def on_update(self_):
+            self_.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.digest = digest
+        self.expires = expires
+        self.new = digest is None
+        self.modified = False
+
+
+class MemoryBackend:
+    """In-process LRU session backend, sessions are not shared between processes"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        """Returns the data of the session and the time it expires at, or None"""
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[sid]
+                return None
+            self._entries.move_to_end(sid)
+            return entry
+
+    def set(self, sid, data, ttl):
+        with self._lock:
+            self._entries[sid] = (data, time.time() + ttl)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def touch(self, sid, ttl):
+        """Extends the session without writing its data again"""
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is not None:
+                self._entries[sid] = (entry[0], time.time() + ttl)
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+
+class SQLiteBackend:
+    """SQLite session backend in WAL mode, shared by all processes using the same file"""
+    PURGE_EVERY_WRITES = 1000
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                'sid TEXT PRIMARY KEY, data BLOB NOT NULL, expires REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)')
+
+    def get(self, sid):
+        """Returns the data of the session and the time it expires at, or None"""
+        row = self._connection().execute(
+            'SELECT data, expires FROM sessions WHERE sid = ? AND expires > ?', (sid, time.time())
+        ).fetchone()
+        return row
+
+    def set(self, sid, data, ttl):
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)',
+                (sid, data, now + ttl)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY_WRITES == 0:
+                connection.execute('DELETE FROM sessions WHERE expires <= ?', (now,))
+
+    def touch(self, sid, ttl):
+        """Extends the session without writing its data again"""
+        with self._connection() as connection:
+            connection.execute('UPDATE sessions SET expires = ? WHERE sid = ?', (time.time() + ttl, sid))
+
+    def delete(self, sid):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def reset(self):
+        """Drops the connection of the current thread, e.g. after the process was forked"""
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.file_path, timeout=10)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+
+class ServerSessionInterface(SessionInterface):
+    """
+    Flask session interface storing sessions in a pluggable backend.
+    Sessions are serialized as compact tagged JSON and expire after the TTL
+    without requests. They are written back only when their content has changed,
+    sessions that are only read are extended once half of their TTL has passed
+    """
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+
+    @classmethod
+    def from_config(cls, config):
+        """Creates the interface for the SESSION_BACKEND configured for the app"""
+        ttl = int(config['SESSION_TTL_IN_SECONDS'])
+        if config['SESSION_BACKEND'] == 'memory':
+            backend = MemoryBackend(int(config['SESSION_MEMORY_MAX_ENTRIES']))
+        elif config['SESSION_BACKEND'] == 'sqlite':
+            backend = SQLiteBackend(config['SESSION_SQLITE_PATH'])
+        else:
+            raise ValueError(f"Unknown session backend: {config['SESSION_BACKEND']}")
+        return cls(backend, ttl)
+
+    @Metrics.track_stage('session_open')
+    def open_session(self, app, request):
+        sid = self._unsign(app, request.cookies.get(self.get_cookie_name(app)))
+        if sid:
+            entry = self.backend.get(sid)
+            if entry is not None:
+                data, expires = entry
+                return ServerSession(
+                    self.serializer.loads(data), sid=sid, digest=self._digest(data), expires=expires
+                )
+        return ServerSession(sid=secrets.token_urlsafe(32))
+
+    @Metrics.track_stage('session_save')
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        cookie_path = self.get_cookie_path(app)
+
+        if not session:
+            if not session.new:
+                self.backend.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=cookie_path)
+            return
+
+        response.vary.add('Cookie')
+        data = self.serializer.dumps(dict(session)).encode('utf-8')
+        if self._digest(data) != session.digest:
+            self.backend.set(session.sid, data, self.ttl)
+        elif session.expires - time.time() < self.ttl / 2:
+            self.backend.touch(session.sid, self.ttl)
+
+        if session.new or (session.permanent and self.should_set_cookie(app, session)):
+            response.set_cookie(
+                name,
+                self._sign(app, session.sid),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=cookie_path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
+
+    @staticmethod
+    def _digest(data):
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    @staticmethod
+    def _sign(app, sid):
+        return Signer(app.secret_key, salt='server-session').sign(sid).decode('utf-8')
+
+    @staticmethod
+    def _unsign(app, cookie):
+        if not cookie:
+            return None
+        try:
+            return Signer(app.secret_key, salt='server-session').unsign(cookie).decode('utf-8')
+        except BadSignature:
+            return None
@@ -0,0 +1,259 @@
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from app.ds_config import STATUS_STORE_PATH, CONNECT_HMAC_KEYS
+
+
+class EnvelopeStatusStore:
+    """
+    Local SQLite store of envelope and recipient statuses.
+    It is fed by Docusign Connect events and by polled status changes,
+    envelopes are kept in the same shape as EnvelopesApi returns them
+    """
+    _local = threading.local()
+    _schema_lock = threading.Lock()
+    _schema_ready = set()
+
+    @staticmethod
+    def is_connect_enabled():
+        """Connect events are trusted only when HMAC keys are configured"""
+        return bool(CONNECT_HMAC_KEYS)
+
+    @classmethod
+    def get_envelopes(cls, account_id, envelope_ids):
+        """Returns stored envelopes by envelope ID with their recipients"""
+        if not envelope_ids:
+            return {}
+
+        connection = cls._connection()
+        placeholders = ','.join('?' * len(envelope_ids))
+        rows = connection.execute(
+            f'SELECT envelope_id, data FROM envelopes WHERE account_id = ? AND envelope_id IN ({placeholders})',
+            [account_id, *envelope_ids]
+        ).fetchall()
+        envelopes = {envelope_id: json.loads(data) for envelope_id, data in rows}
+
+        recipients = connection.execute(
+            f'SELECT envelope_id, recipient_id, data FROM recipients WHERE envelope_id IN ({placeholders})',
+            list(envelopes)
+        ).fetchall() if envelopes else []
+        for envelope_id, recipient_id, data in recipients:
+            cls._merge_recipient(envelopes[envelope_id], recipient_id, json.loads(data))
+        return envelopes
+
+    @classmethod
+    def get_status(cls, account_id, envelope_id):
+        """Returns the stored status of the envelope or None"""
+        row = cls._connection().execute(
+            'SELECT status FROM envelopes WHERE account_id = ? AND envelope_id = ?',
+            (account_id, envelope_id)
+        ).fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    def get_version(cls, account_id, envelope_id):
+        """Returns the stored status of the envelope with the time of its
+        last envelope or recipient status change, or None
+        """
+        row = cls._connection().execute(
+            'SELECT envelopes.status, envelopes.status_changed, MAX(recipients.status_changed) '
+            'FROM envelopes LEFT JOIN recipients ON recipients.envelope_id = envelopes.envelope_id '
+            'WHERE envelopes.account_id = ? AND envelopes.envelope_id = ? GROUP BY envelopes.envelope_id',
+            (account_id, envelope_id)
+        ).fetchone()
+        return list(row) if row else None
+
+    @classmethod
+    def save_envelopes(cls, account_id, envelopes):
+        """Stores envelopes unless a newer status is already known
+        Parameters:
+            envelopes (list): Envelope dicts in the EnvelopesApi shape
+        """
+        rows = [
+            (
+                env['envelope_id'],
+                account_id,
+                env.get('status'),
+                env.get('status_changed_date_time') or '',
+                json.dumps(env, default=str)
+            )
+            for env in envelopes
+        ]
+        with cls._connection() as connection:
+            connection.executemany(
+                'INSERT INTO envelopes (envelope_id, account_id, status, status_changed, data) '
+                'VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (envelope_id) DO UPDATE SET '
+                'status = excluded.status, status_changed = excluded.status_changed, data = excluded.data '
+                'WHERE excluded.status_changed >= envelopes.status_changed',
+                rows
+            )
+
+    @classmethod
+    def save_recipient(cls, envelope_id, recipient):
+        """Stores the status of a single recipient
+        Parameters:
+            recipient (dict): Signer dict in the EnvelopesApi shape
+        """
+        with cls._connection() as connection:
+            connection.execute(
+                'INSERT INTO recipients (envelope_id, recipient_id, status, status_changed, data) '
+                'VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (envelope_id, recipient_id) DO UPDATE SET '
+                'status = excluded.status, status_changed = excluded.status_changed, data = excluded.data '
+                'WHERE excluded.status_changed >= recipients.status_changed',
+                (
+                    envelope_id,
+                    str(recipient['recipient_id']),
+                    recipient.get('status'),
+                    recipient.get('status_changed_date_time') or '',
+                    json.dumps(recipient, default=str)
+                )
+            )
+
+    @classmethod
+    def record_created(cls, account_id, envelope_id, envelope):
+        """Stores the initial status of an envelope that was just sent
+        Parameters:
+            envelope (dict): Envelope definition JSON payload
+        """
+        now = cls.now()
+        signers = [
+            {
+                'recipient_id': signer.get('recipientId'),
+                'name': signer.get('name'),
+                'email': signer.get('email'),
+                'status': 'sent'
+            }
+            for signer in envelope.get('recipients', {}).get('signers', [])
+        ]
+        cls.save_envelopes(account_id, [{
+            'envelope_id': envelope_id,
+            'email_subject': envelope.get('emailSubject'),
+            'status': envelope.get('status'),
+            'created_date_time': now,
+            'sent_date_time': now,
+            'status_changed_date_time': now,
+            'recipients': {'signers': signers}
+        }])
+
+    @classmethod
+    def save_connect_event(cls, event):
+        """Stores the statuses from a Connect JSON (SIM) event
+        Returns:
+            ID of the envelope the event belongs to
+        """
+        if not isinstance(event, dict):
+            raise ValueError('Connect event is not a JSON object')
+        data = event.get('data') or {}
+        if not isinstance(data, dict):
+            raise ValueError('Connect event data is not a JSON object')
+        envelope_id = data.get('envelopeId')
+        account_id = data.get('accountId')
+        summary = data.get('envelopeSummary')
+        if not envelope_id:
+            raise ValueError('Connect event has no envelopeId')
+        if summary is not None and not isinstance(summary, dict):
+            raise ValueError('Connect event envelopeSummary is not a JSON object')
+
+        if summary:
+            envelope = cls.to_snake_case(summary)
+            envelope['envelope_id'] = envelope_id
+            envelope.pop('documents', None)
+            envelope.setdefault('status_changed_date_time', event.get('generatedDateTime'))
+            # Checked before anything is stored, the event is not stored partially
+            envelope['recipients'] = cls._connect_recipients(envelope.get('recipients'))
+            cls.save_envelopes(account_id, [envelope])
+
+            for signer in envelope['recipients']['signers']:
+                cls.save_recipient(envelope_id, signer)
+
+        elif str(event.get('event') or '').startswith('recipient-') and data.get('recipientId'):
+            cls.save_recipient(envelope_id, {
+                'recipient_id': data['recipientId'],
+                'status': event['event'][len('recipient-'):],
+                'status_changed_date_time': event.get('generatedDateTime')
+            })
+
+        return envelope_id
+
+    @staticmethod
+    def _connect_recipients(recipients):
+        """Returns the recipients of a Connect envelope summary, signers without an ID are left out
+        Raises:
+            ValueError when the recipients are not in the EnvelopesApi shape
+        """
+        recipients = recipients or {}
+        if not isinstance(recipients, dict):
+            raise ValueError('Connect event recipients is not a JSON object')
+        signers = recipients.get('signers') or []
+        if not isinstance(signers, list) or not all(isinstance(signer, dict) for signer in signers):
+            raise ValueError('Connect event signers is not a list of JSON objects')
+        return dict(recipients, signers=[signer for signer in signers if signer.get('recipient_id')])
+
+    @staticmethod
+    def to_snake_case(value):
+        """Converts camelCase keys of Connect payloads to the EnvelopesApi snake_case shape"""
+        if isinstance(value, dict):
+            return {
+                re.sub(r'(?<!^)(?=[A-Z])', '_', key).lower(): EnvelopeStatusStore.to_snake_case(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [EnvelopeStatusStore.to_snake_case(item) for item in value]
+        return value
+
+    @staticmethod
+    def now():
+        return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+    @classmethod
+    def reset(cls):
+        """Drops the connections of the current thread, e.g. after the process was forked"""
+        connection = getattr(cls._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+        cls._local = threading.local()
+
+    @staticmethod
+    def _merge_recipient(envelope, recipient_id, recipient):
+        signers = envelope.setdefault('recipients', {}).setdefault('signers', [])
+        for signer in signers:
+            if str(signer.get('recipient_id')) == recipient_id:
+                if (recipient.get('status_changed_date_time') or '') >= (signer.get('status_changed_date_time') or ''):
+                    signer.update((key, item) for key, item in recipient.items() if item is not None)
+                return
+        signers.append(recipient)
+
+    @classmethod
+    def _connection(cls):
+        connection = getattr(cls._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(STATUS_STORE_PATH, timeout=10)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            cls._create_schema(connection)
+            cls._local.connection = connection
+        return connection
+
+    @classmethod
+    def _create_schema(cls, connection):
+        with cls._schema_lock:
+            if STATUS_STORE_PATH in cls._schema_ready:
+                return
+            with connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS envelopes ('
+                    'envelope_id TEXT PRIMARY KEY, account_id TEXT, status TEXT, '
+                    'status_changed TEXT NOT NULL, data TEXT NOT NULL)'
+                )
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS recipients ('
+                    'envelope_id TEXT NOT NULL, recipient_id TEXT NOT NULL, status TEXT, '
+                    'status_changed TEXT NOT NULL, data TEXT NOT NULL, '
+                    'PRIMARY KEY (envelope_id, recipient_id))'
+                )
+            cls._schema_ready.add(STATUS_STORE_PATH)
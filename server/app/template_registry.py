@@ -0,0 +1,161 @@
+import base64
+import os
+import re
+import threading
+from os import path
+
+from jinja2 import Environment, BaseLoader, meta
+
+from app.ds_config import TPL_PATH, IMG_PATH, MINIFY_DOCUMENTS, LOGO_URL
+from app.metrics import Metrics
+
+_HTML_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+_STYLE_BLOCK = re.compile(r'(<style[^>]*>)(.*?)(</style>)', re.DOTALL | re.IGNORECASE)
+_CSS_SPACING = re.compile(r'\s*([{};:,>])\s*')
+# Meta tags of search engines and link previews, the converted documents never use them
+_PREVIEW_META = re.compile(r'<meta\s+(?:name|property)="(?:description|og:[^"]*|twitter:[^"]*)"[^>]*>', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+# Whitespace around block level tags is not rendered, around inline tags it is
+_BLOCK_TAG = re.compile(
+    r'\s*(</?(?:html|head|body|meta|title|style|link|header|main|nav|section|form|div|p|h[1-6]|ul|ol|li|'
+    r'table|thead|tbody|tr|td|th|hr|br)\b[^>]*>)\s*',
+    re.IGNORECASE
+)
+
+
+class TemplateRegistry:
+    """
+    Keeps compiled Jinja templates from TPL_PATH in memory.
+    A template is compiled once per variant (plain or with white styled
+    fields replaced) and recompiled only when the file changes on disk
+    """
+    LOGO_FILE = 'logo.png'
+
+    _environment = Environment(loader=BaseLoader)
+    _templates = {}
+    _logo = None
+    _lock = threading.Lock()
+
+    @classmethod
+    @Metrics.track_stage('template_render')
+    def render(cls, tpl, render_context, fields_to_replace=None):
+        """Renders the template with the given context
+        Parameters:
+            tpl (str): Template file name in TPL_PATH
+            render_context (dict): Values passed to the template
+            fields_to_replace (list): Fields whose white styled anchors
+                should be replaced with the field values
+        Returns:
+            Rendered HTML string
+        """
+        template = cls.get_template(tpl, fields_to_replace)
+        return template.render(logo_src=cls.get_logo_src(), **render_context)
+
+    @classmethod
+    def render_placeholders(cls, tpl, fields_to_replace=None):
+        """Renders the template without values, every variable is replaced
+        with a white /name/ anchor that tabs can be placed on
+        Returns:
+            tuple of the rendered HTML string and the names of the variables
+        """
+        entry = cls._get_entry(tpl, fields_to_replace)
+        # The document does not depend on the request, it is rendered once per template version
+        if 'placeholders' not in entry:
+            context = {
+                name: f'<span style="color: white">/{name}/</span>'
+                for name in entry['variables']
+            }
+            entry['placeholders'] = entry['template'].render(context, logo_src=cls.get_logo_src())
+        return entry['placeholders'], entry['variables']
+
+    @classmethod
+    def get_template(cls, tpl, fields_to_replace=None):
+        """Returns the compiled template, compiling it if needed"""
+        return cls._get_entry(tpl, fields_to_replace)['template']
+
+    @classmethod
+    def _get_entry(cls, tpl, fields_to_replace):
+        key = (tpl, tuple(fields_to_replace or ()))
+        file_path = path.join(TPL_PATH, tpl)
+        mtime = os.stat(file_path).st_mtime_ns
+
+        entry = cls._templates.get(key)
+        if entry is None or entry['mtime'] != mtime:
+            with cls._lock:
+                entry = cls._templates.get(key)
+                if entry is None or entry['mtime'] != mtime:
+                    template, variables = cls._compile(file_path, fields_to_replace)
+                    entry = {
+                        'mtime': mtime,
+                        'template': template,
+                        'variables': variables
+                    }
+                    cls._templates[key] = entry
+        return entry
+
+    @classmethod
+    def get_logo_src(cls):
+        """Returns the logo image source of the HTML files, the hosted logo when
+        LOGO_URL is set so the image is not base64-encoded twice in the envelope
+        """
+        if LOGO_URL:
+            return LOGO_URL
+        return 'data:image/png;base64,' + cls.get_logo_base64()
+
+    @classmethod
+    def get_logo_base64(cls):
+        """Returns the base64 representation of the logo pasted into the HTML files"""
+        file_path = path.join(IMG_PATH, cls.LOGO_FILE)
+        mtime = os.stat(file_path).st_mtime_ns
+
+        logo = cls._logo
+        if logo is None or logo['mtime'] != mtime:
+            with open(file_path, 'rb') as file:
+                logo = {
+                    'mtime': mtime,
+                    'base64': base64.b64encode(file.read()).decode('utf-8')
+                }
+            cls._logo = logo
+        return logo['base64']
+
+    @classmethod
+    def preload(cls, variants=(None,)):
+        """Compiles all HTML templates in TPL_PATH for the given variants"""
+        for tpl in sorted(os.listdir(TPL_PATH)):
+            if tpl.endswith('.html'):
+                for fields_to_replace in variants:
+                    cls.get_template(tpl, fields_to_replace)
+        cls.get_logo_base64()
+
+    @classmethod
+    def _compile(cls, file_path, fields_to_replace):
+        with open(file_path, 'r') as file:
+            content = file.read()
+
+        # Optional cleanup of unwanted inline styles
+        for field in fields_to_replace or ():
+            pattern = rf'<span[^>]*style="color:\s*white"[^>]*>\s*/{field}/\s*</span>'
+            replacement = f'<span class="user-info">{{{{ {field} }}}}</span>'
+            content = re.sub(pattern, replacement, content, flags=re.IGNORECASE)
+
+        if MINIFY_DOCUMENTS:
+            content = cls.minify(content)
+        variables = sorted(meta.find_undeclared_variables(cls._environment.parse(content)) - {'logo_src'})
+        return cls._environment.from_string(content), tuple(variables)
+
+    @staticmethod
+    def minify(content):
+        """Removes the comments, preview meta tags and the whitespace
+        that does not change how the HTML document is rendered
+        """
+        content = _HTML_COMMENT.sub('', content)
+        content = _PREVIEW_META.sub('', content)
+        content = _STYLE_BLOCK.sub(
+            lambda match: match.group(1)
+            + _CSS_SPACING.sub(r'\1', _CSS_COMMENT.sub('', match.group(2))).replace(';}', '}').strip()
+            + match.group(3),
+            content
+        )
+        content = _WHITESPACE.sub(' ', content)
+        return _BLOCK_TAG.sub(r'\1', content).strip()
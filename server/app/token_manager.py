@@ -0,0 +1,104 @@
+import os
+import threading
+from datetime import datetime
+
+from app.ds_config import (
+    TOKEN_REPLACEMENT_IN_SECONDS,
+    TOKEN_REFRESH_MARGIN_IN_SECONDS
+)
+from app.metrics import Metrics
+
+
+class TokenManager:
+    """
+    Process-wide cache of JWT access tokens.
+    Tokens are kept per client ID and impersonated user and are
+    refreshed before they reach TOKEN_REPLACEMENT_IN_SECONDS
+    """
+    _tokens = {}
+    _refresh_locks = {}
+    _private_keys = {}
+    _guard = threading.Lock()
+
+    @classmethod
+    def get_auth_data(cls):
+        """
+        Returns auth data for the configured JWT user, refreshing the
+        cached token if it is about to expire. Only one caller refreshes
+        a given token at a time, the others wait for its result
+        """
+        key = (os.environ.get('DS_CLIENT_ID'), os.environ.get('DS_IMPERSONATED_USER_GUID'))
+
+        entry = cls._tokens.get(key)
+        is_fresh = cls._is_fresh(entry)
+        Metrics.count_cache('jwt_token', is_fresh)
+        if is_fresh:
+            return cls._to_auth_data(entry)
+
+        with cls._get_refresh_lock(key):
+            # Another caller may have refreshed the token while we waited
+            entry = cls._tokens.get(key)
+            if not cls._is_fresh(entry):
+                entry = cls._refresh(key)
+        return cls._to_auth_data(entry)
+
+    @classmethod
+    def get_private_key(cls, key_path):
+        """
+        Returns the parsed RSA private key, reading the key file only once
+        """
+        private_key = cls._private_keys.get(key_path)
+        if private_key is None:
+            # Loaded on first use only, cryptography is slow to import
+            from cryptography.hazmat.primitives import serialization  # pylint: disable=import-outside-toplevel
+            with open(key_path, 'rb') as key_file:
+                private_key = serialization.load_pem_private_key(key_file.read(), password=None)
+            cls._private_keys[key_path] = private_key
+        return private_key
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Drops all cached tokens, e.g. after the consent was revoked
+        """
+        with cls._guard:
+            cls._tokens.clear()
+
+    @classmethod
+    def _refresh(cls, key):
+        from app.ds_client import DsClient # pylint: disable=import-outside-toplevel
+
+        auth_data = DsClient.update_token()
+        entry = {
+            'access_token': auth_data['access_token'],
+            'account_id': auth_data['account_id'],
+            'auth_type': auth_data['auth_type'],
+            'expires_at': cls._now() + auth_data['expires_in']
+        }
+        cls._tokens[key] = entry
+        return entry
+
+    @classmethod
+    def _get_refresh_lock(cls, key):
+        with cls._guard:
+            return cls._refresh_locks.setdefault(key, threading.Lock())
+
+    @classmethod
+    def _is_fresh(cls, entry):
+        if entry is None:
+            return False
+        threshold = TOKEN_REPLACEMENT_IN_SECONDS + TOKEN_REFRESH_MARGIN_IN_SECONDS
+        return entry['expires_at'] - cls._now() > threshold
+
+    @classmethod
+    def _to_auth_data(cls, entry):
+        return {
+            'access_token': entry['access_token'],
+            'account_id': entry['account_id'],
+            'expires_in': entry['expires_at'] - cls._now(),
+            'auth_type': entry['auth_type']
+        }
+
+    @staticmethod
+    def _now():
+        return int(round(datetime.utcnow().timestamp()))
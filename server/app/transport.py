@@ -0,0 +1,328 @@
+import base64
+import gzip
+import hashlib
+import io
+import json
+import logging
+import random
+import re
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from app.ds_config import (
+    TRANSPORT_MODE,
+    TRANSPORT_CASSETTE_PATH,
+    TRANSPORT_REPLAY_LATENCY_MS,
+    TRANSPORT_REPLAY_JITTER_MS,
+    TRANSPORT_REPLAY_ERROR_RATE,
+    TRANSPORT_REPLAY_ERROR_STATUS,
+    TRANSPORT_COMPRESS_MIN_BYTES
+)
+from app.circuit_breaker import CircuitBreaker
+from app.metrics import Metrics
+from app.scheduler import OutboundScheduler, RateLimited
+
+logger = logging.getLogger(__name__)
+
+# Headers that describe the encoding of the body on the wire, recorded bodies are stored decoded
+_WIRE_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection'}
+# Token fields of OAuth responses that must not be written to cassettes
+_SECRET_FIELDS = {'access_token', 'refresh_token', 'id_token'}
+_ID_PATTERN = re.compile(r'/[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}(?=/|$)')
+
+
+class Cassette:
+    """
+    Recorded request/response pairs, one JSON object per line.
+    Replayed requests are matched on method, URL and body hash first,
+    then on method and URL path with IDs ignored, so recorded flows
+    can be replayed with different envelope and user data
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._exact = None
+        self._loose = None
+        self._turns = {}
+
+    def append(self, interaction):
+        line = json.dumps(interaction) + '\n'
+        with self._lock:
+            with open(self.file_path, 'a') as file:
+                file.write(line)
+            self._exact = None
+
+    def find(self, method, url, body_sha256):
+        with self._lock:
+            if self._exact is None:
+                self._load()
+            key = self._exact_key(method, url, body_sha256)
+            candidates = self._exact.get(key)
+            if not candidates:
+                key = self._loose_key(method, url)
+                candidates = self._loose.get(key)
+            if not candidates:
+                return None
+            # Requests matching several interactions get them in turn
+            turn = self._turns.get(key, 0)
+            self._turns[key] = turn + 1
+            return candidates[turn % len(candidates)]
+
+    def _load(self):
+        self._exact, self._loose, self._turns = {}, {}, {}
+        try:
+            with open(self.file_path, 'r') as file:
+                interactions = [json.loads(line) for line in file if line.strip()]
+        except FileNotFoundError:
+            interactions = []
+        for interaction in interactions:
+            method, url = interaction['method'], interaction['url']
+            self._exact.setdefault(self._exact_key(method, url, interaction['body_sha256']), []).append(interaction)
+            self._loose.setdefault(self._loose_key(method, url), []).append(interaction)
+
+    @staticmethod
+    def _exact_key(method, url, body_sha256):
+        parts = urlsplit(url)
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return method.upper(), parts.netloc, parts.path, query, body_sha256
+
+    @staticmethod
+    def _loose_key(method, url):
+        parts = urlsplit(url)
+        return method.upper(), parts.netloc, _ID_PATTERN.sub('/{id}', parts.path)
+
+
+class Transport:
+    """
+    Outbound HTTP transport of the Docusign clients, selected with DS_TRANSPORT_MODE:
+        live    requests go to Docusign (default)
+        record  requests go to Docusign and the pairs are appended to the cassette
+        replay  responses are served from the cassette with injected latency and errors
+    """
+    mode = TRANSPORT_MODE
+    cassette = Cassette(TRANSPORT_CASSETTE_PATH)
+
+    @classmethod
+    def record(cls, method, url, body, status, reason, headers, data, elapsed):
+        """Appends an interaction to the cassette
+        Parameters:
+            body (bytes): Request body, only its hash is recorded
+            headers (list): Response headers as (name, value) pairs
+            data (bytes): Decoded response body
+            elapsed (float): Response time in seconds
+        """
+        interaction = {
+            'method': method.upper(),
+            'url': url,
+            'body_sha256': cls._body_hash(body),
+            'status': status,
+            'reason': reason,
+            'headers': [[name, value] for name, value in headers if name.lower() not in _WIRE_HEADERS],
+            'elapsed_ms': round(elapsed * 1000, 1)
+        }
+        interaction.update(cls._encode_body(cls._redact(data)))
+        cls.cassette.append(interaction)
+
+    @classmethod
+    def replay(cls, method, url, body):
+        """Returns the recorded response to the request
+        Returns:
+            tuple of the status, reason, header pairs and body bytes
+        """
+        interaction = cls.cassette.find(method, url, cls._body_hash(body))
+
+        if interaction is None:
+            latency = TRANSPORT_REPLAY_LATENCY_MS or 0
+        else:
+            latency = TRANSPORT_REPLAY_LATENCY_MS if TRANSPORT_REPLAY_LATENCY_MS is not None \
+                else interaction['elapsed_ms']
+        time.sleep(max(0.0, latency + random.uniform(0, TRANSPORT_REPLAY_JITTER_MS)) / 1000)
+
+        if random.random() < TRANSPORT_REPLAY_ERROR_RATE:
+            return cls._error_response(
+                TRANSPORT_REPLAY_ERROR_STATUS, 'INJECTED_ERROR', 'Error injected by the replay transport',
+                [('Retry-After', '1')]
+            )
+        if interaction is None:
+            logger.warning('No recorded interaction for %s %s', method, url)
+            return cls._error_response(
+                404, 'REPLAY_NOT_FOUND', f'No recorded interaction for {method} {urlsplit(url).path}'
+            )
+
+        if 'body_base64' in interaction:
+            data = base64.b64decode(interaction['body_base64'])
+        else:
+            data = interaction['body'].encode('utf-8')
+        headers = [tuple(header) for header in interaction['headers']]
+        return interaction['status'], interaction['reason'], headers, data
+
+    @staticmethod
+    def encode_body(url, body, headers):
+        """Returns the body and headers to send on the wire.
+        Large bodies of the eSignature REST API, which accepts gzip encoded
+        requests, are compressed. Envelopes are mostly base64 documents
+        """
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        if not isinstance(data, bytes):
+            return body, headers
+
+        wire = data
+        if TRANSPORT_COMPRESS_MIN_BYTES and len(data) >= TRANSPORT_COMPRESS_MIN_BYTES \
+                and '/restapi/' in urlsplit(url).path \
+                and not any(name.lower() == 'content-encoding' for name in headers or ()):
+            wire = gzip.compress(data, compresslevel=6)
+            headers = dict(headers or {}, **{'Content-Encoding': 'gzip'})
+        Metrics.observe_request_body(len(data), len(wire))
+        return wire, headers
+
+    @classmethod
+    def rate_limited_response(cls, retry_after):
+        """Response of a call the outbound scheduler did not send"""
+        return cls._error_response(
+            429, 'RATE_LIMITED', 'The API quota left is reserved for calls of a higher priority',
+            [('Retry-After', str(retry_after))]
+        )
+
+    @staticmethod
+    def _error_response(status, error_code, message, headers=()):
+        data = json.dumps({'errorCode': error_code, 'message': message}).encode('utf-8')
+        return status, error_code, [('Content-Type', 'application/json'), *headers], data
+
+    @staticmethod
+    def _body_hash(body):
+        if body is None:
+            body = b''
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+        elif not isinstance(body, bytes):
+            # Streamed bodies cannot be hashed without consuming them
+            body = b''
+        return hashlib.sha256(body).hexdigest()
+
+    @staticmethod
+    def _redact(data):
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            return data
+        if not isinstance(payload, dict) or not _SECRET_FIELDS.intersection(payload):
+            return data
+        for field in _SECRET_FIELDS.intersection(payload):
+            payload[field] = 'recorded-token'
+        return json.dumps(payload).encode('utf-8')
+
+    @staticmethod
+    def _encode_body(data):
+        try:
+            return {'body': data.decode('utf-8')}
+        except UnicodeDecodeError:
+            return {'body_base64': base64.b64encode(data).decode('ascii')}
+
+
+class TransportPoolManager(urllib3.PoolManager):
+    """urllib3 pool manager of the Docusign SDK clients that schedules, records or replays requests"""
+
+    def urlopen(self, method, url, redirect=True, **kw):  # pylint: disable=arguments-differ
+        if kw.get('timeout') is None:
+            # The SDK passes timeout=None, which would disable the timeout of the pool
+            kw['timeout'] = self.connection_pool_kw.get('timeout')
+
+        def call():
+            response = CircuitBreaker.call(
+                url, lambda: self._send(method, url, redirect, **kw), lambda response: response.status
+            )
+            return response.status, response.headers, response
+
+        try:
+            return OutboundScheduler.send(method, url, call, self._discard)
+        except RateLimited as exc:
+            return self._response(*Transport.rate_limited_response(exc.retry_after), kw.get('preload_content', True))
+
+    def _send(self, method, url, redirect, **kw):
+        if Transport.mode == 'replay':
+            status, reason, headers, data = Transport.replay(method, url, kw.get('body'))
+            return self._response(status, reason, headers, data, kw.get('preload_content', True))
+        # Replay and record match the body as built, only the wire gets it encoded
+        body = kw.get('body')
+        wire_kw = dict(kw)
+        if body is not None:
+            wire_kw['body'], wire_kw['headers'] = Transport.encode_body(url, body, kw.get('headers'))
+        if Transport.mode != 'record':
+            return super().urlopen(method, url, redirect=redirect, **wire_kw)
+
+        preload_content = wire_kw.pop('preload_content', True)
+        start = time.perf_counter()
+        response = super().urlopen(method, url, redirect=redirect, preload_content=True, **wire_kw)
+        headers = list(response.headers.items())
+        Transport.record(
+            method, url, body, response.status, response.reason,
+            headers, response.data, time.perf_counter() - start
+        )
+        return self._response(
+            response.status, response.reason,
+            [(name, value) for name, value in headers if name.lower() not in _WIRE_HEADERS],
+            response.data, preload_content
+        )
+
+    @staticmethod
+    def _response(status, reason, headers, data, preload_content):
+        return urllib3.HTTPResponse(
+            body=io.BytesIO(data),
+            headers=urllib3.HTTPHeaderDict(headers),
+            status=status,
+            reason=reason,
+            preload_content=preload_content,
+            decode_content=False
+        )
+
+    @staticmethod
+    def _discard(response):
+        response.drain_conn()
+        response.release_conn()
+
+
+class TransportAdapter(HTTPAdapter):
+    """requests adapter that schedules, records or replays requests"""
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        def call():
+            response = CircuitBreaker.call(
+                request.url, lambda: self._send(request, **kwargs), lambda response: response.status_code
+            )
+            return response.status_code, response.headers, response
+
+        try:
+            return OutboundScheduler.send(request.method, request.url, call, lambda response: response.close())
+        except RateLimited as exc:
+            return self._response(request, *Transport.rate_limited_response(exc.retry_after))
+
+    def _send(self, request, **kwargs):
+        if Transport.mode == 'replay':
+            return self._response(request, *Transport.replay(request.method, request.url, request.body))
+
+        response = super().send(request, **kwargs)
+        if Transport.mode == 'record':
+            Transport.record(
+                request.method, request.url, request.body, response.status_code, response.reason,
+                list(response.headers.items()), response.content, response.elapsed.total_seconds()
+            )
+        return response
+
+    @staticmethod
+    def _response(request, status, reason, headers, data):
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = data  # pylint: disable=protected-access
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
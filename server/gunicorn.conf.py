@@ -0,0 +1,62 @@
+"""
+Gunicorn settings, every setting can be changed with an environment variable.
+
+GUNICORN_WORKER_CLASS selects the worker type:
+    gthread  one process per worker with a pool of GUNICORN_THREADS threads (default)
+    gevent   green threads, up to GUNICORN_WORKER_CONNECTIONS concurrent requests per
+             worker, suits handlers that mostly wait on Docusign
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # Patch before the app is preloaded, so that sockets and locks
+    # created in the master process are cooperative as well
+    from gevent import monkey
+    monkey.patch_all()
+
+# Workers share their Prometheus metrics through files in this directory,
+# it has to be set before prometheus_client is imported with the app
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'insurance_metrics'))
+# Samples of the previous run must not be added to the new ones
+shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', 5001)}")
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# Load the app once in the master, workers share its memory copy-on-write
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    if workers > 1 and os.environ.get('SESSION_BACKEND') == 'memory':
+        server.log.warning(
+            'SESSION_BACKEND=memory is not shared between %s workers, use sqlite instead', workers
+        )
+
+
+def post_fork(server, worker):  # pylint: disable=unused-argument
+    from wsgi import reset_after_fork  # pylint: disable=import-outside-toplevel
+    reset_after_fork()
+
+
+def child_exit(server, worker):  # pylint: disable=unused-argument
+    from app.metrics import Metrics  # pylint: disable=import-outside-toplevel
+    Metrics.mark_process_dead(worker.pid)
@@ -1,7 +1,10 @@
 from app import app
+from app.payment_gateway_cache import PaymentGatewayCache
 import os
 import sys
 
+PaymentGatewayCache.warm_up()
+
 if os.environ.get("DEBUG", "False") == "True":
     app.config["DEBUG"] = True
     port = int(os.environ.get("PORT", 5001))
@@ -0,0 +1,256 @@
+"""
+Benchmark of the envelope construction.
+
+Runs the four DsDocument builders on generated claims and users with the
+connected fields extensions of tools/fixtures/extensions.json and reports the
+time and the allocated memory of every stage: template rendering, base64
+encoding, tab building, the whole builder, the ApiClient serialization and
+the JSON encoding of the request body, and the size of the request body as built
+and as sent gzip encoded. Nothing is sent to Docusign:
+
+    python tools/bench_envelopes.py --iterations 500 --output bench.json
+    python tools/bench_envelopes.py --compare bench.json
+"""
+import argparse
+import gzip
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# pylint: disable=wrong-import-position
+from app import sdk
+from app.document import DsDocument
+from app.envelope_builder import EnvelopeBuilder
+from app.extension_cache import ExtensionIndex
+# pylint: enable=wrong-import-position
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+FIRST_NAMES = ['Olivia', 'Liam', 'Amelia', 'Noah', 'Sofia', 'Mateo', 'Chloe', 'Hiroshi', 'Zoë', 'Łukasz']
+LAST_NAMES = ['Smith', 'García', 'Nguyen', 'Müller', 'Okafor', "O'Brien", 'Kowalski', 'Tanaka']
+CITIES = [('Seattle', 'WA', 'US', '98101'), ('Austin', 'TX', 'US', '73301'), ('Toronto', 'ON', 'CA', 'M5H 2N2')]
+CLAIM_TYPES = ['Auto', 'Home', 'Travel', 'Health']
+WORDS = 'the vehicle was parked when a tree branch fell during the storm and damaged roof windshield'.split()
+
+ENVELOPE_ARGS = {
+    'signer_client_id': 1000,
+    'ds_return_url': 'http://localhost:3000/success',
+    'gateway_account_id': 'a1b2c3d4-0000-4000-8000-000000000000',
+    'gateway_name': 'Stripe',
+    'payment_display_name': 'Stripe'
+}
+
+
+def generate_user(rng):
+    first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    city, state, country, zip_code = rng.choice(CITIES)
+    return {
+        'first_name': first_name,
+        'last_name': last_name,
+        'email': f"{first_name}.{last_name}@example.com".lower().replace("'", ''),
+        'street': f"{rng.randint(1, 9999)} Main Street",
+        'city': city,
+        'state': state,
+        'country': country,
+        'zip_code': zip_code
+    }
+
+
+def generate_claim(rng):
+    claim = generate_user(rng)
+    claim.update(
+        type=rng.choice(CLAIM_TYPES),
+        timestamp='2024-11-05T14:30:00.000Z',
+        description=' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 400)))
+    )
+    return claim
+
+
+def generate_insurance(rng):
+    return {
+        'detail1': {'name': 'Vehicle', 'value': rng.choice(['Sedan', 'SUV', 'Truck'])},
+        'detail2': {'name': 'Year', 'value': str(rng.randint(1995, 2024))}
+    }
+
+
+def load_extensions():
+    with open(os.path.join(FIXTURES_DIR, 'extensions.json'), 'r') as file:
+        return ExtensionIndex(json.load(file))
+
+
+def claim_stages(extensions, with_extension):
+    """Stages of create_claim and create_claim_without_extension"""
+    def render(data):
+        return DsDocument._render_claim_template(  # pylint: disable=protected-access
+            'submit-claim.html', data['claim'], remove_white_styles=not with_extension
+        )
+
+    def tabs(data):
+        if with_extension:
+            return {
+                'emailTabs': [EnvelopeBuilder.extension_email_tab(extensions, '/email/', data['claim']['email'])],
+                'textTabs': EnvelopeBuilder.extension_address_tabs(extensions, data['claim'])
+            }
+        return {'emailTabs': [EnvelopeBuilder.email_tab('/email/', data['claim']['email'])]}
+
+    def create(data):
+        if with_extension:
+            return DsDocument.create_claim('submit-claim.html', data['claim'], ENVELOPE_ARGS, extensions)
+        return DsDocument.create_claim_without_extension('submit-claim.html', data['claim'], ENVELOPE_ARGS)
+
+    return render, tabs, create
+
+
+def payment_stages(extensions, with_extension):
+    """Stages of create_with_payment and create_with_payment_without_extension"""
+    fields_to_replace = None if with_extension else DsDocument.PAYMENT_FIELDS_TO_REPLACE
+
+    def render(data):
+        context = DsDocument._insurance_render_context(data['user'], data['insurance'])  # pylint: disable=protected-access
+        return DsDocument._read_and_render_template(  # pylint: disable=protected-access
+            'new-insurance.html', context, fields_to_replace
+        )
+
+    def tabs(data):
+        result = DsDocument._create_payment_tabs(ENVELOPE_ARGS)  # pylint: disable=protected-access
+        if with_extension:
+            result['emailTabs'] = [
+                EnvelopeBuilder.extension_email_tab(extensions, '/user_email/', data['user']['email'])
+            ]
+            result['textTabs'] = EnvelopeBuilder.extension_address_tabs(extensions, data['user'])
+        return result
+
+    def create(data):
+        if with_extension:
+            return DsDocument.create_with_payment(
+                'new-insurance.html', data['user'], data['insurance'], ENVELOPE_ARGS, extensions
+            )
+        return DsDocument.create_with_payment_without_extension(
+            'new-insurance.html', data['user'], data['insurance'], ENVELOPE_ARGS
+        )
+
+    return render, tabs, create
+
+
+def measure(function, inputs):
+    """Calls the function once per input, returns timing and memory statistics"""
+    times = []
+    for data in inputs:
+        start = time.perf_counter()
+        function(data)
+        times.append(time.perf_counter() - start)
+
+    # Allocations are measured in a separate pass, tracing slows down the calls
+    peaks = []
+    tracemalloc.start()
+    for data in inputs[:50]:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        function(data)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    times.sort()
+    return {
+        'mean_us': round(statistics.mean(times) * 1e6, 1),
+        'median_us': round(statistics.median(times) * 1e6, 1),
+        'p95_us': round(times[int(len(times) * 0.95) - 1] * 1e6, 1),
+        'peak_kib': round(statistics.median(peaks) / 1024, 1)
+    }
+
+
+def bench_builder(name, stages, inputs, api_client):
+    render, tabs, create = stages
+    rendered = [render(data) for data in inputs]
+    payloads = [create(data) for data in inputs]
+    sanitized = [api_client.sanitize_for_serialization(payload) for payload in payloads]
+
+    results = {
+        'render': measure(render, inputs),
+        'base64': measure(EnvelopeBuilder.encode_document, rendered),
+        'tabs': measure(tabs, inputs),
+        'create': measure(create, inputs),
+        'serialize': measure(api_client.sanitize_for_serialization, payloads),
+        'json': measure(json.dumps, sanitized)
+    }
+    bodies = [json.dumps(body).encode('utf-8') for body in sanitized]
+    results['body_bytes'] = round(statistics.mean(len(body) for body in bodies))
+    results['wire_bytes'] = round(statistics.mean(len(gzip.compress(body, compresslevel=6)) for body in bodies))
+    return name, results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    for builder, stages in results['builders'].items():
+        print(f"\n{builder} (request body {stages['body_bytes']} bytes, {stages.get('wire_bytes')} bytes gzip)")
+        for stage, stats in stages.items():
+            if stage in ('body_bytes', 'wire_bytes'):
+                continue
+            line = f"  {stage:<10} {stats['median_us']:>10} us median {stats['p95_us']:>10} us p95 " \
+                   f"{stats['peak_kib']:>9} KiB"
+            previous = (baseline or {}).get('builders', {}).get(builder, {}).get(stage)
+            if previous:
+                line += f"   {stats['median_us'] / previous['median_us']:.2f}x of {baseline.get('revision')}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare with')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    inputs = [
+        {'claim': generate_claim(rng), 'user': generate_user(rng), 'insurance': generate_insurance(rng)}
+        for _ in range(args.iterations)
+    ]
+    extensions = load_extensions()
+    api_client = sdk.ApiClient()
+    DsDocument.preload_templates()
+
+    results = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'iterations': args.iterations,
+        'seed': args.seed,
+        'builders': dict([
+            bench_builder('create_claim', claim_stages(extensions, True), inputs, api_client),
+            bench_builder('create_claim_without_extension', claim_stages(extensions, False), inputs, api_client),
+            bench_builder('create_with_payment', payment_stages(extensions, True), inputs, api_client),
+            bench_builder(
+                'create_with_payment_without_extension', payment_stages(extensions, False), inputs, api_client
+            )
+        ])
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark of the server-side session backends.
+
+Compares the Flask-Session filesystem backend with the in-memory LRU and
+the SQLite WAL backends of app.session_store on a read-mostly workload
+that resembles the app (every request reads the session, some modify it):
+
+    python tools/bench_sessions.py --requests 2000 --threads 4 --write-ratio 0.2
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from flask import Flask, session
+from flask_session import Session
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.session_store import ServerSessionInterface  # pylint: disable=wrong-import-position
+
+
+def create_app(backend, work_dir):
+    bench_app = Flask(__name__)
+    bench_app.config.update(
+        SECRET_KEY='benchmark',
+        SESSION_PERMANENT=False,
+        SESSION_COOKIE_NAME='sid',
+        SESSION_BACKEND=backend,
+        SESSION_TTL_IN_SECONDS=3600,
+        SESSION_MEMORY_MAX_ENTRIES=100000,
+        SESSION_SQLITE_PATH=os.path.join(work_dir, 'sessions.db'),
+        SESSION_TYPE='filesystem',
+        SESSION_FILE_DIR=os.path.join(work_dir, 'flask_session'),
+        SESSION_USE_SIGNER=True
+    )
+    if backend == 'filesystem':
+        Session(bench_app)
+    else:
+        bench_app.session_interface = ServerSessionInterface.from_config(bench_app.config)
+
+    @bench_app.route('/login')
+    def login():
+        session['access_token'] = 'x' * 1200
+        session['account_id'] = 'a4b3c2d1-0000-0000-0000-000000000000'
+        session['auth_type'] = 'jwt'
+        session['expires_date'] = int(time.time()) + 3600
+        return 'ok'
+
+    @bench_app.route('/read')
+    def read():
+        return session.get('account_id', '')
+
+    @bench_app.route('/write')
+    def write():
+        session['expires_date'] = time.time()
+        return 'ok'
+
+    return bench_app
+
+
+def run_client(bench_app, requests_count, write_ratio, latencies):
+    client = bench_app.test_client()
+    client.get('/login')
+    write_every = int(1 / write_ratio) if write_ratio else 0
+    for number in range(requests_count):
+        url = '/write' if write_every and number % write_every == 0 else '/read'
+        start = time.perf_counter()
+        client.get(url)
+        latencies.append(time.perf_counter() - start)
+
+
+def bench(backend, args):
+    with tempfile.TemporaryDirectory() as work_dir:
+        bench_app = create_app(backend, work_dir)
+        latencies = []
+        per_thread = args.requests // args.threads
+        threads = [
+            threading.Thread(target=run_client, args=(bench_app, per_thread, args.write_ratio, latencies))
+            for _ in range(args.threads)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'backend': backend,
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--backends', nargs='+', default=['filesystem', 'memory', 'sqlite'])
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = [bench(backend, args) for backend in args.backends]
+    for result in results:
+        print('{backend:<12} {requests_per_second:>10} req/s   p50 {p50_ms:>8} ms   p99 {p99_ms:>8} ms'.format(**result))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
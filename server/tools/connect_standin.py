@@ -0,0 +1,101 @@
+"""
+Local stand-in for Docusign Connect.
+
+Posts signed sample Connect (JSON SIM) events for an envelope to the
+webhook of a locally running server, e.g.:
+
+    python tools/connect_standin.py --envelope-id <id> --account-id <id>
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+
+import requests
+
+DEFAULT_EVENTS = ['envelope-sent', 'recipient-delivered', 'recipient-completed', 'envelope-completed']
+
+
+def now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f0Z')
+
+
+def build_event(event, account_id, envelope_id, signer_name, signer_email):
+    """Builds a Connect event in the JSON SIM format with the envelope summary included"""
+    generated = now()
+    envelope_status = 'completed' if event in ('recipient-completed', 'envelope-completed') else 'sent'
+    recipient_status = event[len('recipient-'):] if event.startswith('recipient-') else envelope_status
+
+    return {
+        'event': event,
+        'apiVersion': 'v2.1',
+        'uri': f'/restapi/v2.1/accounts/{account_id}/envelopes/{envelope_id}',
+        'retryCount': 0,
+        'configurationId': 10000001,
+        'generatedDateTime': generated,
+        'data': {
+            'accountId': account_id,
+            'userId': str(uuid.uuid4()),
+            'envelopeId': envelope_id,
+            'recipientId': '1',
+            'envelopeSummary': {
+                'status': envelope_status,
+                'emailSubject': 'Submit a Claim',
+                'statusChangedDateTime': generated,
+                'sentDateTime': generated,
+                'recipients': {
+                    'signers': [{
+                        'recipientId': '1',
+                        'name': signer_name,
+                        'email': signer_email,
+                        'status': recipient_status,
+                        'statusChangedDateTime': generated
+                    }]
+                }
+            }
+        }
+    }
+
+
+def sign(payload, key):
+    digest = hmac.new(key.encode('utf-8'), payload, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def main():
+    keys = [key for key in os.environ.get('DS_CONNECT_HMAC_KEYS', '').split(',') if key]
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5001/api/requests/connect')
+    parser.add_argument('--key', default=keys[0] if keys else None, help='HMAC key, defaults to DS_CONNECT_HMAC_KEYS')
+    parser.add_argument('--account-id', required=True)
+    parser.add_argument('--envelope-id', required=True)
+    parser.add_argument('--signer-name', default='Jane Doe')
+    parser.add_argument('--signer-email', default='jane.doe@example.com')
+    parser.add_argument('--events', nargs='+', default=DEFAULT_EVENTS)
+    args = parser.parse_args()
+
+    if not args.key:
+        parser.error('an HMAC key is required')
+
+    for event in args.events:
+        payload = json.dumps(
+            build_event(event, args.account_id, args.envelope_id, args.signer_name, args.signer_email)
+        ).encode('utf-8')
+        response = requests.post(args.url, data=payload, timeout=10, headers={
+            'Content-Type': 'application/json',
+            'X-DocuSign-Signature-1': sign(payload, args.key)
+        })
+        print(f'{event}: {response.status_code} {response.text.strip()}')
+        if response.status_code != 200:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Cold start report of the Flask app.
+
+Every run starts a fresh interpreter, imports the app and serves its first
+request. The report shows the median timings of the runs and the modules
+that take the longest to import in the process, measured with `python -X importtime`:
+
+    python tools/startup_report.py --runs 5 --top 15
+
+With --max-first-request-ms the script exits with status 1 when the time to
+the first request is above the threshold, so it can be used as a CI check.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Runs in the child interpreter, times are relative to the start of the script
+CHILD_SCRIPT = """
+import json
+import time
+
+start = time.perf_counter()
+from app import app
+imported = time.perf_counter()
+app.test_client().get('/api/get_status')
+first_request = time.perf_counter()
+from app import sdk
+sdk.ApiClient
+sdk_loaded = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': (first_request - start) * 1000,
+    'sdk_load_ms': (sdk_loaded - first_request) * 1000
+}))
+"""
+
+
+def run_child(extra_args=()):
+    env = dict(os.environ, PYTHONPATH=SERVER_DIR)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *extra_args, '-c', CHILD_SCRIPT],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    process_ms = (time.perf_counter() - started) * 1000
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, process_ms, result.stderr
+
+
+def parse_importtime(stderr):
+    """Returns the import time in ms spent in the modules of each top level package"""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1000
+    return packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='Number of packages in the import breakdown')
+    parser.add_argument('--max-first-request-ms', type=float, help='Fail when the first request is slower')
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    args = parser.parse_args()
+
+    runs = [run_child() for _ in range(args.runs)]
+    report = {
+        'runs': args.runs,
+        'process_ms': round(statistics.median(process_ms for _, process_ms, _ in runs), 1)
+    }
+    for key in ('import_ms', 'first_request_ms', 'sdk_load_ms'):
+        report[key] = round(statistics.median(timings[key] for timings, _, _ in runs), 1)
+
+    _, _, importtime = run_child(['-X', 'importtime'])
+    packages = sorted(parse_importtime(importtime).items(), key=lambda item: item[1], reverse=True)
+    report['imports_ms'] = {package: round(ms, 1) for package, ms in packages[:args.top]}
+
+    print(f"interpreter and first request: {report['process_ms']} ms")
+    print(f"import app:                    {report['import_ms']} ms")
+    print(f"first request:                 {report['first_request_ms']} ms")
+    print(f"deferred Docusign SDK load:    {report['sdk_load_ms']} ms")
+    print('\nslowest packages to import:')
+    for package, ms in report['imports_ms'].items():
+        print(f'  {package:<30} {ms:>8} ms')
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.max_first_request_ms is not None and report['first_request_ms'] > args.max_first_request_ms:
+        print(
+            f"\nFirst request took {report['first_request_ms']} ms, "
+            f"the limit is {args.max_first_request_ms} ms",
+            file=sys.stderr
+        )
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
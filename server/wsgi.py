@@ -0,0 +1,42 @@
+"""
+Production entry point, served by gunicorn with the settings of gunicorn.conf.py:
+
+    gunicorn --config gunicorn.conf.py
+
+The app, the document templates and the Docusign clients are loaded once
+in the master process and shared by the forked workers.
+"""
+from app import app
+from app.claim_batch import ClaimBatch
+from app.client_pool import ClientPool
+from app.document import DsDocument
+from app.document_cache import DocumentCache
+from app.ds_config import DS_AUTH_SERVER, DS_DEMO_SERVER
+from app.envelope_registry import EnvelopeRegistry
+from app.log_pipeline import LogPipeline
+from app.payment_gateway_cache import PaymentGatewayCache
+from app.status_store import EnvelopeStatusStore
+
+
+def preload():
+    """Loads everything that can be shared by the workers before forking"""
+    DsDocument.preload_templates()
+    ClientPool.preload([DS_AUTH_SERVER, DS_DEMO_SERVER and DS_DEMO_SERVER + '/restapi'])
+    # The workers inherit the JWT token and the payment gateways of its account
+    PaymentGatewayCache.warm_up()
+
+
+def reset_after_fork():
+    """Drops connections inherited from the master process, they must not be shared"""
+    LogPipeline.reset()
+    ClientPool.reset()
+    ClaimBatch.reset()
+    EnvelopeStatusStore.reset()
+    EnvelopeRegistry.reset()
+    DocumentCache.reset()
+    backend = getattr(app.session_interface, 'backend', None)
+    if hasattr(backend, 'reset'):
+        backend.reset()
+
+
+preload()